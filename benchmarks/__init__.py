@@ -0,0 +1 @@
+"""Microbenchmarks for Stuart Energy integration."""
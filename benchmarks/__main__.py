@@ -0,0 +1,224 @@
+"""
+Microbenchmarks for the Stuart Energy hot paths.
+
+Times decoding (timestamp parsing and payload digests), hourly aggregation,
+statistics building and the backfill loop on synthetic payloads. The
+recorder is stubbed out, so only the integration's own work is measured.
+
+Run through ``scripts/benchmark``, see DEVELOPMENT.md.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any
+from unittest.mock import patch
+
+from homeassistant.util import dt as dt_util
+from stuartev import importer as importer_module
+from stuartev.backfill import StuartEnergyBackfill
+from stuartev.importer import StuartEnergyImporter
+from stuartev.models import SolarStats
+
+from .payloads import (
+    SCENARIOS,
+    TIME_ZONE,
+    aggregate_by_day,
+    build_payload,
+    split_by_day,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+STATISTIC_ID = "stuartev:benchmark_energy_generated"
+SITE_INFO = {"name": "Benchmark"}
+HOURLY_DAYS = 31
+
+
+class _RecorderStub:
+    """Recorder stand-in answering every statistics query with no rows."""
+
+    def __init__(self) -> None:
+        self.rows_written = 0
+
+    def get_instance(self, _hass: Any) -> SimpleNamespace:
+        async def _async_add_executor_job(*_args: Any) -> dict:
+            return {}
+
+        return SimpleNamespace(async_add_executor_job=_async_add_executor_job)
+
+    def async_add_external_statistics(
+        self, _hass: Any, _metadata: Any, rows: list
+    ) -> None:
+        self.rows_written += len(rows)
+
+
+class _FakeApi:
+    """API client serving solar-stats windows from pre-built daily payloads."""
+
+    def __init__(self, days: dict[str, dict]) -> None:
+        self.days = days
+
+    async def async_get_energy_data(
+        self, date_from: str, date_to: str, aggregate_type: str = "Hour"
+    ) -> SolarStats:
+        day = date.fromisoformat(date_from[:10])
+        last_day = date.fromisoformat(date_to[:10])
+        segments: list[dict] = []
+        total = 0.0
+        while day <= last_day:
+            if payload := self.days.get(day.isoformat()):
+                if aggregate_type == "Day":
+                    payload = aggregate_by_day(payload)
+                segments.extend(payload["energyGeneratedSegments"])
+                total += payload["totalGeneratedKwh"]
+            day += timedelta(days=1)
+        return SolarStats.from_json(
+            {"totalGeneratedKwh": total, "energyGeneratedSegments": segments},
+            TIME_ZONE,
+        )
+
+
+async def _async_time(
+    func: Callable[[], Awaitable[Any] | Any], repeat: int
+) -> dict[str, float]:
+    """Run ``func`` ``repeat`` times and return the min and median in ms."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        if asyncio.iscoroutine(result):
+            await result
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+    }
+
+
+async def _async_run_scenario(
+    name: str, first_day: date, days: int, repeat: int
+) -> dict[str, dict[str, float]]:
+    """Time every hot path on one scenario."""
+    payload = build_payload(first_day, days)
+    stats = SolarStats.from_json(payload, TIME_ZONE)
+    hourly_data = StuartEnergyImporter.aggregate_segments(stats.segments)
+    daily_payloads = split_by_day(payload)
+    end = datetime.combine(
+        first_day + timedelta(days=days), datetime.min.time(), tzinfo=TIME_ZONE
+    )
+    hass = SimpleNamespace()
+
+    async def _import() -> None:
+        importer = StuartEnergyImporter(hass, SITE_INFO, STATISTIC_ID)
+        await importer.import_hourly(hourly_data)
+
+    async def _backfill() -> None:
+        importer = StuartEnergyImporter(hass, SITE_INFO, STATISTIC_ID)
+        await StuartEnergyBackfill(
+            _FakeApi(daily_payloads), importer, concurrency=4, chunk_days=7
+        ).async_run(end, days)
+
+    async def _backfill_tiered() -> None:
+        importer = StuartEnergyImporter(hass, SITE_INFO, STATISTIC_ID)
+        await StuartEnergyBackfill(
+            _FakeApi(daily_payloads),
+            importer,
+            concurrency=4,
+            chunk_days=7,
+            hourly_days=HOURLY_DAYS,
+        ).async_run(end, days)
+
+    results = {
+        "decode": await _async_time(
+            lambda: SolarStats.from_json(payload, TIME_ZONE), repeat
+        ),
+        "aggregate": await _async_time(
+            lambda: StuartEnergyImporter.aggregate_segments(stats.segments), repeat
+        ),
+        "statistics": await _async_time(_import, repeat),
+        "backfill": await _async_time(_backfill, repeat),
+        "backfill_tiered": await _async_time(_backfill_tiered, repeat),
+    }
+    return {
+        f"{bench}/{name}": {**timing, "segments": len(stats.segments)}
+        for bench, timing in results.items()
+    }
+
+
+async def _async_run(scenarios: list[str], repeat: int) -> dict[str, Any]:
+    """Run the selected scenarios with the recorder stubbed out."""
+    dt_util.set_default_time_zone(TIME_ZONE)
+    recorder = _RecorderStub()
+    results: dict[str, dict[str, float]] = {}
+    with (
+        patch.object(importer_module, "get_instance", recorder.get_instance),
+        patch.object(
+            importer_module,
+            "async_add_external_statistics",
+            recorder.async_add_external_statistics,
+        ),
+    ):
+        for name in scenarios:
+            first_day, days = SCENARIOS[name]
+            results.update(await _async_run_scenario(name, first_day, days, repeat))
+    return {
+        "python": platform.python_version(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def _format_results(report: dict[str, Any], baseline: dict[str, Any] | None) -> str:
+    """Format the results, with the change against a baseline if given."""
+    previous = baseline["results"] if baseline else {}
+    header = f"{'benchmark':<20} {'segments':>9} {'min ms':>10} {'median ms':>10}"
+    lines = [header + (f" {'baseline':>10} {'change':>8}" if baseline else "")]
+    for name, result in report["results"].items():
+        line = (
+            f"{name:<20} {result['segments']:>9} "
+            f"{result['min_ms']:>10.3f} {result['median_ms']:>10.3f}"
+        )
+        if baseline and (old := previous.get(name)) is not None:
+            change = (result["min_ms"] - old["min_ms"]) / old["min_ms"] * 100
+            line += f" {old['min_ms']:>10.3f} {change:>+7.1f}%"
+        elif baseline:
+            line += f" {'-':>10} {'-':>8}"
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+def main() -> int:
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(prog="scripts/benchmark", description=__doc__)
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=sorted(SCENARIOS),
+        help="Scenario to run, may be repeated (default: all)",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to compare to")
+    args = parser.parse_args()
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    report = asyncio.run(_async_run(args.scenario or list(SCENARIOS), args.repeat))
+    sys.stdout.write(_format_results(report, baseline))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
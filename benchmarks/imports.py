@@ -0,0 +1,121 @@
+"""
+Import-time benchmark for Stuart Energy integration.
+
+Imports the config flow and the runtime stack in fresh interpreters, after
+the Home Assistant modules that are always loaded when a flow is opened,
+and reports the time and the modules each import adds. Fails if the config
+flow loads any of the runtime modules again, or takes longer than a budget.
+
+Run through ``scripts/benchmark imports``, see DEVELOPMENT.md.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# Module imported per target, the config flow is the one guarded.
+TARGETS = {
+    "config_flow": "stuartev.config_flow",
+    "runtime": "stuartev.coordinator",
+}
+GUARDED_TARGET = "config_flow"
+# Modules the config flow must not load, they are only needed by set up entries.
+FORBIDDEN_MODULES = (
+    "homeassistant.components.recorder.statistics",
+    "homeassistant.helpers.update_coordinator",
+    "stuartev.api",
+    "stuartev.backfill",
+    "stuartev.coordinator",
+    "stuartev.importer",
+    "stuartev.models",
+)
+
+_MEASURE = """
+import importlib, json, sys, time
+import voluptuous
+import homeassistant.config_entries
+import homeassistant.helpers.aiohttp_client
+preloaded = set(sys.modules)
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "modules": sorted(set(sys.modules) - preloaded)}))
+"""
+
+
+def _measure(module: str) -> dict:
+    """Import ``module`` in a fresh interpreter and return the time and modules."""
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", _MEASURE, module],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return json.loads(result.stdout)
+
+
+def _run(repeat: int) -> dict[str, dict]:
+    """Measure every target ``repeat`` times."""
+    results: dict[str, dict] = {}
+    for name, module in TARGETS.items():
+        runs = [_measure(module) for _ in range(repeat)]
+        times = [run["seconds"] * 1000 for run in runs]
+        results[name] = {
+            "module": module,
+            "min_ms": round(min(times), 3),
+            "median_ms": round(statistics.median(times), 3),
+            "modules": runs[0]["modules"],
+        }
+    return results
+
+
+def _check(results: dict[str, dict], max_ms: float | None) -> list[str]:
+    """Return the regressions of the guarded target."""
+    guarded = results[GUARDED_TARGET]
+    problems = [
+        f"{guarded['module']} loads {module}"
+        for module in FORBIDDEN_MODULES
+        if module in guarded["modules"]
+    ]
+    if max_ms is not None and guarded["min_ms"] > max_ms:
+        problems.append(
+            f"{guarded['module']} takes {guarded['min_ms']:.1f} ms, "
+            f"over the {max_ms:.1f} ms budget"
+        )
+    return problems
+
+
+def main() -> int:
+    """Run the import-time benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="scripts/benchmark imports", description=__doc__
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per target")
+    parser.add_argument(
+        "--max-ms", type=float, help="Fail if the config flow import is slower"
+    )
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    results = _run(args.repeat)
+    lines = [f"{'target':<12} {'modules':>8} {'min ms':>10} {'median ms':>10}"]
+    lines.extend(
+        f"{name:<12} {len(result['modules']):>8} "
+        f"{result['min_ms']:>10.3f} {result['median_ms']:>10.3f}"
+        for name, result in results.items()
+    )
+    problems = _check(results, args.max_ms)
+    lines.extend(f"FAIL: {problem}" for problem in problems)
+    sys.stdout.write("\n".join(lines) + "\n")
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
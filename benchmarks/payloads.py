@@ -0,0 +1,120 @@
+"""
+Synthetic solar-stats payloads for the benchmarks.
+
+Payloads are deterministic, so timings can be compared across commits.
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import UTC, date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+TIME_ZONE = ZoneInfo("Europe/Vilnius")
+SEGMENT = timedelta(minutes=15)
+DATETIME_FORMAT_LOCAL = "%Y-%m-%dT%H:%M:%S"
+SUNRISE_HOUR = 5
+SUNSET_HOUR = 21
+
+# Each scenario covers at least one DST transition of TIME_ZONE.
+SCENARIOS: dict[str, tuple[date, int]] = {
+    "1d": (date(2025, 3, 30), 1),
+    "30d": (date(2025, 10, 12), 30),
+    "365d": (date(2025, 1, 1), 365),
+}
+
+
+def _segment_kwh(local: datetime) -> float:
+    """Return a bell-shaped production value for a 15-minute segment."""
+    hour = local.hour + local.minute / 60
+    if not SUNRISE_HOUR <= hour < SUNSET_HOUR:
+        return 0.0
+    season = 0.6 + 0.4 * math.sin(math.pi * (local.timetuple().tm_yday - 80) / 365)
+    daylight = (hour - SUNRISE_HOUR) / (SUNSET_HOUR - SUNRISE_HOUR)
+    return round(1.2 * season * math.sin(math.pi * daylight) ** 2, 5)
+
+
+def build_payload(first_day: date, days: int) -> dict:
+    """
+    Build a solar-stats response with 15-minute segments.
+
+    Segments are stepped in UTC and labelled with the naive local time, so
+    the skipped and repeated hours of DST days appear as the API sends them.
+
+    :param first_day: First local day of the payload
+    :param days: Number of days covered
+    :return: Response as decoded from JSON
+    """
+    start = datetime.combine(first_day, time.min, tzinfo=TIME_ZONE).astimezone(UTC)
+    end = datetime.combine(
+        first_day + timedelta(days=days), time.min, tzinfo=TIME_ZONE
+    ).astimezone(UTC)
+    segments = []
+    current = start
+    while current < end:
+        local = current.astimezone(TIME_ZONE)
+        segments.append(
+            {
+                "dateTimeLocal": local.strftime(DATETIME_FORMAT_LOCAL),
+                "energyGeneratedKwh": _segment_kwh(local),
+            }
+        )
+        current += SEGMENT
+
+    total = round(sum(segment["energyGeneratedKwh"] for segment in segments), 5)
+    return {
+        "totalGeneratedKwh": total,
+        "co2ReducedKg": round(total * 0.42, 5),
+        "energyGeneratedSegments": segments,
+    }
+
+
+def aggregate_by_day(payload: dict) -> dict:
+    """Return a payload with one segment per day, as for ``aggregateType=Day``."""
+    return {
+        **payload,
+        "energyGeneratedSegments": [
+            {
+                "dateTimeLocal": f"{day}T00:00:00",
+                "energyGeneratedKwh": day_payload["totalGeneratedKwh"],
+            }
+            for day, day_payload in split_by_day(payload).items()
+        ],
+    }
+
+
+def clip_payload(payload: dict, date_from: str, date_to: str) -> dict:
+    """
+    Return a payload with the segments starting within the given bounds.
+
+    :param date_from: First local segment time, in DATETIME_FORMAT_LOCAL
+    :param date_to: Last local segment time, in DATETIME_FORMAT_LOCAL
+    """
+    segments = [
+        segment
+        for segment in payload["energyGeneratedSegments"]
+        if date_from <= segment["dateTimeLocal"] <= date_to
+    ]
+    total = round(sum(segment["energyGeneratedKwh"] for segment in segments), 5)
+    return {
+        "totalGeneratedKwh": total,
+        "co2ReducedKg": round(total * 0.42, 5),
+        "energyGeneratedSegments": segments,
+    }
+
+
+def split_by_day(payload: dict) -> dict[str, dict]:
+    """Split a payload into single-day payloads keyed by ``YYYY-MM-DD``."""
+    days: dict[str, list[dict]] = {}
+    for segment in payload["energyGeneratedSegments"]:
+        days.setdefault(segment["dateTimeLocal"][:10], []).append(segment)
+    return {
+        day: {
+            "totalGeneratedKwh": round(
+                sum(segment["energyGeneratedKwh"] for segment in segments), 5
+            ),
+            "co2ReducedKg": None,
+            "energyGeneratedSegments": segments,
+        }
+        for day, segments in days.items()
+    }
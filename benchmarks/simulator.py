@@ -0,0 +1,281 @@
+"""
+Local Stuart API simulator.
+
+Serves the sign-in, token refresh, site and solar-stats endpoints below one
+base URL, with configurable latency and fault injection. Point a config
+entry at it through the advanced ``api_endpoint`` option to load-test
+backfills, polling and recovery offline.
+
+Run through ``scripts/simulator``, see DEVELOPMENT.md.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import secrets
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from http import HTTPStatus
+
+from aiohttp import web
+
+from .payloads import (
+    DATETIME_FORMAT_LOCAL,
+    SEGMENT,
+    TIME_ZONE,
+    aggregate_by_day,
+    build_payload,
+    clip_payload,
+)
+
+TOKEN_TTL_DEFAULT = 3600  # Seconds
+
+
+@dataclass(slots=True)
+class Faults:
+    """Fault injection settings, rates are probabilities per request."""
+
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: int = 2
+    unauthorized_rate: float = 0.0
+    error_rate: float = 0.0
+    truncate_rate: float = 0.0
+    token_ttl: int = TOKEN_TTL_DEFAULT
+
+
+class StuartSimulator:
+    """aiohttp application imitating the Stuart and token services."""
+
+    def __init__(self, sites: list[str], faults: Faults, seed: int | None) -> None:
+        """
+        Initialize the simulator.
+
+        :param sites: Site IDs known to the simulator, others answer 404
+        :param faults: Latency and fault injection settings
+        :param seed: Seed of the fault injection, for reproducible runs
+        """
+        self.sites = sites
+        self.faults = faults
+        self.random = random.Random(seed)  # noqa: S311
+        self.counters: Counter[str] = Counter()
+        self.started = time.monotonic()
+        self._tokens: dict[str, float] = {}
+        self._refresh_tokens: set[str] = set()
+
+    def application(self) -> web.Application:
+        """Return the aiohttp application."""
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post("/v1/accounts:signInWithPassword", self._sign_in)
+        app.router.add_post("/v1/token", self._refresh)
+        app.router.add_get("/api/slink/sites/{site_id}", self._site)
+        app.router.add_get("/api/slink/sites/{site_id}/solar-stats", self._solar_stats)
+        app.router.add_get("/_stats", self._stats)
+        return app
+
+    def _chance(self, rate: float) -> bool:
+        """Return True with probability ``rate``."""
+        return rate > 0 and self.random.random() < rate
+
+    @web.middleware
+    async def _middleware(
+        self, request: web.Request, handler: web.RequestHandler
+    ) -> web.StreamResponse:
+        """Apply latency and the faults shared by every endpoint."""
+        if request.path == "/_stats":
+            return await handler(request)
+        resource = request.match_info.route.resource
+        path = resource.canonical if resource else request.path
+        self.counters[f"requests {request.method} {path}"] += 1
+        self.counters["requests"] += 1
+        if self.faults.latency or self.faults.latency_jitter:
+            await asyncio.sleep(
+                self.faults.latency + self.random.uniform(0, self.faults.latency_jitter)
+            )
+        if self._chance(self.faults.throttle_rate):
+            self.counters["injected 429"] += 1
+            return web.json_response(
+                {"error": "rate limited"},
+                status=HTTPStatus.TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(self.faults.retry_after)},
+            )
+        if self._chance(self.faults.error_rate):
+            self.counters["injected 503"] += 1
+            return web.json_response(
+                {"error": "unavailable"}, status=HTTPStatus.SERVICE_UNAVAILABLE
+            )
+        return await handler(request)
+
+    def _issue_tokens(self) -> tuple[str, str]:
+        """Issue a new ID token and refresh token."""
+        token = secrets.token_urlsafe(16)
+        refresh_token = secrets.token_urlsafe(16)
+        self._tokens[token] = time.monotonic() + self.faults.token_ttl
+        self._refresh_tokens.add(refresh_token)
+        return token, refresh_token
+
+    def _authorized(self, request: web.Request) -> bool:
+        """Return True if the request carries a valid, unexpired token."""
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        expires = self._tokens.get(token)
+        if expires is None or expires < time.monotonic():
+            self.counters["rejected token"] += 1
+            return False
+        if self._chance(self.faults.unauthorized_rate):
+            # Revoke the token, so a retry with the same token fails as well.
+            del self._tokens[token]
+            self.counters["injected 401"] += 1
+            return False
+        return True
+
+    async def _sign_in(self, _request: web.Request) -> web.Response:
+        """Answer a password sign-in."""
+        token, refresh_token = self._issue_tokens()
+        return web.json_response(
+            {
+                "idToken": token,
+                "refreshToken": refresh_token,
+                "expiresIn": str(self.faults.token_ttl),
+            }
+        )
+
+    async def _refresh(self, request: web.Request) -> web.Response:
+        """Answer a token refresh."""
+        body = await request.json()
+        if body.get("refresh_token") not in self._refresh_tokens:
+            return web.json_response(
+                {"error": "invalid refresh token"}, status=HTTPStatus.BAD_REQUEST
+            )
+        self._refresh_tokens.discard(body["refresh_token"])
+        token, refresh_token = self._issue_tokens()
+        return web.json_response(
+            {
+                "id_token": token,
+                "refresh_token": refresh_token,
+                "expires_in": str(self.faults.token_ttl),
+            }
+        )
+
+    def _check_site(self, request: web.Request) -> web.Response | None:
+        """Return an error response for unauthorized requests and unknown sites."""
+        if not self._authorized(request):
+            return web.json_response(
+                {"error": "unauthorized"}, status=HTTPStatus.UNAUTHORIZED
+            )
+        if request.match_info["site_id"] not in self.sites:
+            return web.json_response(
+                {"error": "not found"}, status=HTTPStatus.NOT_FOUND
+            )
+        return None
+
+    async def _site(self, request: web.Request) -> web.Response:
+        """Answer a site info request."""
+        if error := self._check_site(request):
+            return error
+        site_id = request.match_info["site_id"]
+        return web.json_response(
+            {
+                "id": site_id,
+                "name": f"Simulated site {site_id}",
+                "solarParkAttributes": {"objectId": f"sim{site_id}"},
+            }
+        )
+
+    async def _solar_stats(self, request: web.Request) -> web.Response:
+        """
+        Answer a solar-stats request with synthetic segments or daily totals.
+
+        Only segments starting within the requested local times are served,
+        and only those that have already ended, like the API does.
+        """
+        if error := self._check_site(request):
+            return error
+        try:
+            date_from = datetime.strptime(  # noqa: DTZ007
+                request.query["dateFromLocal"], DATETIME_FORMAT_LOCAL
+            )
+            date_to = datetime.strptime(  # noqa: DTZ007
+                request.query["dateToLocal"], DATETIME_FORMAT_LOCAL
+            )
+        except KeyError, ValueError:
+            return web.json_response(
+                {"error": "invalid dates"}, status=HTTPStatus.BAD_REQUEST
+            )
+        last_ended = (datetime.now(UTC) - SEGMENT).astimezone(TIME_ZONE)
+        date_to = min(date_to, last_ended.replace(tzinfo=None))
+        first_day = date_from.date()
+        payload = build_payload(
+            first_day, max(0, (date_to.date() - first_day).days + 1)
+        )
+        payload = clip_payload(
+            payload,
+            date_from.strftime(DATETIME_FORMAT_LOCAL),
+            date_to.strftime(DATETIME_FORMAT_LOCAL),
+        )
+        if request.query.get("aggregateType") == "Day":
+            payload = aggregate_by_day(payload)
+        if self._chance(self.faults.truncate_rate):
+            # Keep the announced total, so the client can detect the truncation.
+            segments = payload["energyGeneratedSegments"]
+            del segments[len(segments) // 2 :]
+            self.counters["injected truncation"] += 1
+        self.counters["segments served"] += len(payload["energyGeneratedSegments"])
+        return web.json_response(payload)
+
+    async def _stats(self, _request: web.Request) -> web.Response:
+        """Return the request and fault counters."""
+        elapsed = time.monotonic() - self.started
+        return web.json_response(
+            {
+                "elapsed_seconds": round(elapsed, 1),
+                "requests_per_second": round(self.counters["requests"] / elapsed, 2),
+                "counters": dict(sorted(self.counters.items())),
+            },
+            dumps=lambda data: json.dumps(data, indent=2),
+        )
+
+
+def main() -> None:
+    """Run the simulator from the command line."""
+    parser = argparse.ArgumentParser(prog="scripts/simulator", description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--sites", default="1", help="Comma separated site IDs")
+    parser.add_argument("--seed", type=int, help="Seed of the fault injection")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="Seconds")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="429 rate")
+    parser.add_argument("--retry-after", type=int, default=2, help="Seconds")
+    parser.add_argument("--unauthorized-rate", type=float, default=0.0, help="401")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="503 rate")
+    parser.add_argument("--truncate-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--token-ttl", type=int, default=TOKEN_TTL_DEFAULT, help="Token lifetime"
+    )
+    args = parser.parse_args()
+
+    simulator = StuartSimulator(
+        [site.strip() for site in args.sites.split(",") if site.strip()],
+        Faults(
+            latency=args.latency,
+            latency_jitter=args.latency_jitter,
+            throttle_rate=args.throttle_rate,
+            retry_after=args.retry_after,
+            unauthorized_rate=args.unauthorized_rate,
+            error_rate=args.error_rate,
+            truncate_rate=args.truncate_rate,
+            token_ttl=args.token_ttl,
+        ),
+        args.seed,
+    )
+    web.run_app(simulator.application(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
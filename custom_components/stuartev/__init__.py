@@ -8,22 +8,41 @@ For more details about this integration, please refer to
 https://github.com/juokelis/hacs-stuartev
 """
 
+import asyncio
+import importlib
 from functools import partial
 from typing import TYPE_CHECKING, Any
 
 import voluptuous as vol
 from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
+from homeassistant.core import SupportsResponse, callback
+from homeassistant.helpers import entity_registry as er
 
-from .api import StuartEnergyApiClientCommunicationError
-from .const import CONF_API_KEY, DAYS_DEFAULT, DAYS_MAX, DOMAIN, LOGGER
-from .coordinator import StuartEnergyCoordinator
+from .auth import StuartAuth
+from .const import (
+    CONF_API_ENDPOINT,
+    CONF_API_KEY,
+    CONF_TRACING,
+    DAYS_DEFAULT,
+    DAYS_MAX,
+    DOMAIN,
+    LOGGER,
+    SITE_POLL_CONCURRENCY,
+)
+from .exceptions import StuartEnergyApiClientCommunicationError
 
 if TYPE_CHECKING:
     from homeassistant.config_entries import ConfigEntry
-    from homeassistant.core import HomeAssistant, ServiceCall
+    from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse
+
+    from .coordinator import StuartEnergyCoordinator
 
 
+# Modules imported on entry setup, including the ones they import.
+RUNTIME_MODULES = ("api", "coordinator")
 SERVICE_IMPORT_HISTORY = "import_history"
+SERVICE_REPAIR_HISTORY = "repair_history"
+SERVICE_GET_TRACES = "get_traces"
 SERVICE_SCHEMA_IMPORT_HISTORY = vol.Schema(
     {
         vol.Optional("days", default=DAYS_DEFAULT): vol.All(
@@ -33,8 +52,10 @@ SERVICE_SCHEMA_IMPORT_HISTORY = vol.Schema(
 )
 
 
-async def _async_handle_import_history(hass: HomeAssistant, call: ServiceCall) -> None:
-    """Re-import recent historical statistics for all loaded Stuart entries."""
+async def _async_handle_import_history(
+    hass: HomeAssistant, call: ServiceCall, *, repair: bool = False
+) -> None:
+    """Start re-importing or repairing recent history for all loaded entries."""
     days = call.data["days"]
     domain_data: dict[str, dict[str, Any]] = hass.data.get(DOMAIN, {})
 
@@ -43,13 +64,75 @@ async def _async_handle_import_history(hass: HomeAssistant, call: ServiceCall) -
         return
 
     for entry_id, entry_data in domain_data.items():
-        coordinator: StuartEnergyCoordinator = entry_data["coordinator"]
+        coordinators: dict[str, StuartEnergyCoordinator] = entry_data["coordinators"]
         LOGGER.info(
-            "Re-importing %d days of Stuart Energy history for entry %s",
+            "%s %d days of Stuart Energy history for %d sites of entry %s",
+            "Repairing" if repair else "Re-importing",
             days,
+            len(coordinators),
             entry_id,
         )
-        await coordinator.import_historical_data(days)
+        for coordinator in coordinators.values():
+            coordinator.async_start_history_import(days, repair=repair)
+
+
+async def _async_handle_get_traces(
+    hass: HomeAssistant, _call: ServiceCall
+) -> ServiceResponse:
+    """Return the recorded traces of all loaded entries."""
+    domain_data: dict[str, dict[str, Any]] = hass.data.get(DOMAIN, {})
+    return {
+        "entries": {
+            entry_id: list(entry_data["tracer"].traces)
+            for entry_id, entry_data in domain_data.items()
+        }
+    }
+
+
+def parse_site_ids(site_ids: str) -> list[str]:
+    """
+    Split the configured site IDs.
+
+    :param site_ids: One site ID or several separated by commas
+    :return: Site IDs in configured order, without duplicates
+    """
+    return list(
+        dict.fromkeys(
+            site_id.strip() for site_id in str(site_ids).split(",") if site_id.strip()
+        )
+    )
+
+
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """
+    Migrate an old config entry.
+
+    Version 1 entries managed a single site with fixed entity unique IDs,
+    version 2 namespaces them per site.
+
+    :param hass: Home Assistant instance
+    :param entry: Config entry to migrate
+    :return: True if migration was successful
+    """
+    if entry.version == 1:
+        site_id = next(iter(parse_site_ids(entry.data.get("site_id", ""))), "")
+
+        @callback
+        def _migrate_unique_id(entity_entry: er.RegistryEntry) -> dict[str, str] | None:
+            """Prefix the old fixed unique IDs with the site ID."""
+            if entity_entry.unique_id in (
+                "stuart_energy_generated",
+                "stuart_co2_reduced",
+            ):
+                suffix = entity_entry.unique_id.removeprefix("stuart_")
+                return {"new_unique_id": f"{site_id}_{suffix}"}
+            return None
+
+        await er.async_migrate_entries(hass, entry.entry_id, _migrate_unique_id)
+        hass.config_entries.async_update_entry(entry, version=2)
+        LOGGER.info("Migrated Stuart Energy entry %s to version 2", entry.entry_id)
+
+    return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -60,6 +143,17 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     :param entry: Config entry with user data
     :return: True if setup was successful, False otherwise
     """
+    # The client, coordinator and recorder statistics are only needed once an
+    # entry is set up, not to load the config flow. They are first imported
+    # in the executor, so reading them from disk does not block the loop.
+    for module in RUNTIME_MODULES:
+        await hass.async_add_import_executor_job(
+            importlib.import_module, f"{__package__}.{module}"
+        )
+    from .api import StuartEnergyApiClient  # noqa: PLC0415
+    from .coordinator import StuartEnergyCoordinator  # noqa: PLC0415
+    from .tracing import StuartTracer  # noqa: PLC0415
+
     data = entry.data
     options = entry.options
 
@@ -68,20 +162,56 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     if not all(k in data and data[k] for k in required_keys):
         return False
 
-    history_days = (
-        options.get("history_days")
-        if options
-        else data.get("history_days", DAYS_DEFAULT)
-    )
+    history_days = options.get("history_days", data.get("history_days", DAYS_DEFAULT))
     if not (1 <= history_days <= DAYS_MAX):
         history_days = DAYS_DEFAULT
 
-    _coordinator = StuartEnergyCoordinator(hass, entry)
+    auth = StuartAuth(
+        hass,
+        data[CONF_EMAIL],
+        data[CONF_PASSWORD],
+        data[CONF_API_KEY],
+        endpoint=options.get(CONF_API_ENDPOINT, data.get(CONF_API_ENDPOINT)),
+    )
+    entry.async_on_unload(auth.async_cancel_refresh)
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
+    # Sites share one token; their scheduled polls are spread over the scan
+    # interval, or with adaptive polling over the minutes after an hour is
+    # published, and at most SITE_POLL_CONCURRENCY of them run at once.
+    site_ids = parse_site_ids(data["site_id"])
+    poll_semaphore = asyncio.Semaphore(SITE_POLL_CONCURRENCY)
+    history_lock = asyncio.Lock()
+    tracer = StuartTracer(
+        enabled=options.get(CONF_TRACING, data.get(CONF_TRACING, False))
+    )
+    coordinators = {
+        site_id: StuartEnergyCoordinator(
+            hass,
+            entry,
+            StuartEnergyApiClient(hass, auth, site_id),
+            poll_semaphore=poll_semaphore,
+            history_lock=history_lock,
+            tracer=tracer,
+            stagger=index / len(site_ids),
+        )
+        for index, site_id in enumerate(site_ids)
+    }
 
     try:
-        await _coordinator.initialize_site_info()
-        await _coordinator.import_historical_data(history_days)
-        await _coordinator.async_config_entry_first_refresh()
+        # Token acquisition is single-flight, so the sites sign in only once.
+        await asyncio.gather(
+            *(
+                _coordinator.initialize_site_info()
+                for _coordinator in coordinators.values()
+            )
+        )
+        await asyncio.gather(
+            *(
+                _coordinator.async_config_entry_first_refresh()
+                for _coordinator in coordinators.values()
+            )
+        )
     except StuartEnergyApiClientCommunicationError as err:
         LOGGER.exception(
             "StuartEV setup failed due to API communication error: %s", err
@@ -92,8 +222,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         return False
 
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
-        "coordinator": _coordinator,
-        "client": _coordinator.api,
+        "auth": auth,
+        "coordinators": coordinators,
+        "tracer": tracer,
     }
 
     if not hass.services.has_service(DOMAIN, SERVICE_IMPORT_HISTORY):
@@ -103,12 +234,41 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             partial(_async_handle_import_history, hass),
             schema=SERVICE_SCHEMA_IMPORT_HISTORY,
         )
+    if not hass.services.has_service(DOMAIN, SERVICE_REPAIR_HISTORY):
+        hass.services.async_register(
+            DOMAIN,
+            SERVICE_REPAIR_HISTORY,
+            partial(_async_handle_import_history, hass, repair=True),
+            schema=SERVICE_SCHEMA_IMPORT_HISTORY,
+        )
+    if not hass.services.has_service(DOMAIN, SERVICE_GET_TRACES):
+        hass.services.async_register(
+            DOMAIN,
+            SERVICE_GET_TRACES,
+            partial(_async_handle_get_traces, hass),
+            supports_response=SupportsResponse.ONLY,
+        )
 
     await hass.config_entries.async_forward_entry_setups(entry, ["sensor"])
 
+    # History can take hundreds of requests, so do not hold up startup for it.
+    # Only the days missing from the recorder are fetched.
+    for _coordinator in coordinators.values():
+        _coordinator.async_start_history_import(history_days, repair=True)
+
     return True
 
 
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """
+    Reload a config entry after its options changed.
+
+    :param hass: Home Assistant instance
+    :param entry: Config entry whose options changed
+    """
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """
     Unload a config entry.
@@ -119,8 +279,29 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """
     await hass.config_entries.async_forward_entry_unload(entry, "sensor")
     hass.data[DOMAIN].pop(entry.entry_id)
-    if not hass.data[DOMAIN] and hass.services.has_service(
-        DOMAIN, SERVICE_IMPORT_HISTORY
-    ):
-        hass.services.async_remove(DOMAIN, SERVICE_IMPORT_HISTORY)
+    if not hass.data[DOMAIN]:
+        for service in (
+            SERVICE_IMPORT_HISTORY,
+            SERVICE_REPAIR_HISTORY,
+            SERVICE_GET_TRACES,
+        ):
+            if hass.services.has_service(DOMAIN, service):
+                hass.services.async_remove(DOMAIN, service)
     return True
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """
+    Remove the stored history of a deleted config entry.
+
+    :param hass: Home Assistant instance
+    :param entry: Config entry being removed
+    """
+    await hass.async_add_import_executor_job(
+        importlib.import_module, f"{__package__}.cache"
+    )
+    from .cache import StuartEnergyHistoryCache  # noqa: PLC0415
+
+    endpoint = entry.options.get(CONF_API_ENDPOINT, entry.data.get(CONF_API_ENDPOINT))
+    for site_id in parse_site_ids(entry.data.get("site_id", "")):
+        await StuartEnergyHistoryCache.async_remove(hass, site_id, endpoint)
@@ -6,140 +6,295 @@ with the Stuart Energy API, including fetching energy data and site information.
 """
 
 import asyncio
+import logging
+import random
+import time
 from http import HTTPStatus
 from typing import TYPE_CHECKING, Any
 
+from aiohttp import ClientConnectionError, ClientResponseError
 from homeassistant.helpers import aiohttp_client
+from homeassistant.util import dt as dt_util
+from homeassistant.util.json import json_loads
 
-from .auth import StuartAuth
-from .const import BASE_API_URL, LOGGER
+from .circuit import async_get_circuit_breaker
+from .const import (
+    AGGREGATE_HOUR,
+    API_MAX_ATTEMPTS,
+    API_REQUEST_TIMEOUT,
+    API_RETRY_JITTER,
+    API_RETRY_MAX_DELAY,
+    LOGGER,
+    PAYLOAD_LOG_LIMIT,
+    PAYLOAD_LOGGER,
+)
+from .exceptions import (
+    StuartEnergyApiClientAuthenticationError,
+    StuartEnergyApiClientCircuitOpenError,
+    StuartEnergyApiClientCommunicationError,
+    StuartEnergyApiClientError,
+    StuartEnergyApiClientInvalidSiteIDError,
+    StuartEnergyApiClientThrottledError,
+)
+from .metrics import StuartMetrics
+from .models import SolarStats
+from .ratelimit import async_get_rate_limiter
+from .tracing import span
 
 if TYPE_CHECKING:
+    from aiohttp import ClientResponse
     from homeassistant.core import HomeAssistant
 
+    from .auth import StuartAuth
 
-class StuartEnergyApiClientError(Exception):
-    """Exception to indicate a general API error."""
-
-
-class StuartEnergyApiClientCommunicationError(
-    StuartEnergyApiClientError,
-):
-    """Exception to indicate a communication error."""
-
-
-class StuartEnergyApiClientAuthenticationError(
-    StuartEnergyApiClientError,
-):
-    """Exception to indicate an authentication error."""
-
-
-class StuartEnergyApiClientInvalidSiteIDError(StuartEnergyApiClientError):
-    """Exception to indicate an invalid site ID error."""
-
-    def __init__(self) -> None:
-        """Initialize the error with a message."""
-        super().__init__("Invalid site ID")
+# The exceptions live in a module of their own, so the config flow can catch
+# them without loading the client. They are re-exported here.
+__all__ = [
+    "StuartEnergyApiClient",
+    "StuartEnergyApiClientAuthenticationError",
+    "StuartEnergyApiClientCircuitOpenError",
+    "StuartEnergyApiClientCommunicationError",
+    "StuartEnergyApiClientError",
+    "StuartEnergyApiClientInvalidSiteIDError",
+    "StuartEnergyApiClientThrottledError",
+]
 
 
 class StuartEnergyApiClient:
     """Client for interacting with the Stuart Energy API."""
 
-    def __init__(
-        self, hass: HomeAssistant, email: str, password: str, api_key: str, site_id: str
-    ) -> None:
+    def __init__(self, hass: HomeAssistant, auth: StuartAuth, site_id: str) -> None:
         """
         Initialize the StuartEnergyApiClient.
 
         :param hass: HomeAssistant instance
-        :param email: User email
-        :param password: User password
-        :param api_key: API Key
+        :param auth: Authentication shared by all sites of the account
         :param site_id: Site ID
         """
         self.session = aiohttp_client.async_get_clientsession(hass)
         self.site_id = site_id
-        self.auth = StuartAuth(hass, email, password, api_key, self.session)
+        self.auth = auth
+        # Entries pointed at e.g. the simulator do not throttle or trip the
+        # circuit of the real API.
+        self.rate_limiter = async_get_rate_limiter(hass, auth.api_host)
+        self.circuit = async_get_circuit_breaker(hass, auth.api_host)
+        self.metrics = StuartMetrics()
 
     def _raise_invalid_site_error(self) -> None:
         """Raise an error if the site ID is invalid."""
         LOGGER.error("Site ID not found: %s", self.site_id)
         raise StuartEnergyApiClientInvalidSiteIDError
 
-    async def _get(self, url: str, params: dict[str, Any] | None = None) -> Any:
+    @staticmethod
+    def _retry_after(response: ClientResponse) -> float:
+        """Return the delay requested by a 429 response in seconds."""
+        try:
+            return max(0.0, float(response.headers.get("Retry-After", 1)))
+        except ValueError:
+            return 1.0
+
+    @staticmethod
+    def _headers(token: Any) -> dict[str, str]:
+        """Return the headers of an authorized API request."""
+        return {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+            "Referer": "https://app.stuart.energy",
+        }
+
+    @staticmethod
+    async def _async_log_body(response: ClientResponse) -> None:
+        """Dump the response body to the payload logger if it is enabled."""
+        if not PAYLOAD_LOGGER.isEnabledFor(logging.DEBUG):
+            return
+        # aiohttp keeps the body, so the JSON decode does not read it again.
+        body = await response.read()
+        PAYLOAD_LOGGER.debug(
+            "Response body of %s (%d bytes): %s",
+            response.url,
+            len(body),
+            body[:PAYLOAD_LOG_LIMIT].decode(errors="replace"),
+        )
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Return a full-jitter exponential backoff delay in seconds."""
+        return random.uniform(0, min(API_RETRY_MAX_DELAY, 2 ** (attempt - 1)))  # noqa: S311
+
+    async def _get(
+        self, endpoint: str, url: str, params: dict[str, Any] | None = None
+    ) -> Any:
         """
-        Fetch data from the API.
+        Fetch data from the API through the circuit breaker.
 
+        :param endpoint: Endpoint name the request is counted under
         :param url: API endpoint URL
         :param params: API query parameters
         :return: data from the API response
         """
-        token = await self.auth.get_token()
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/json",
-            "Referer": "https://app.stuart.energy",
-        }
+        if not self.circuit.allow_request():
+            raise StuartEnergyApiClientCircuitOpenError
 
+        # Client errors prove the API is up, only other failures trip the circuit.
+        success: bool | None = None
+        metrics = self.metrics.endpoint(endpoint)
         try:
+            data = await self._get_with_retries(endpoint, url, params)
+        except StuartEnergyApiClientInvalidSiteIDError as err:
+            success = True
+            metrics.errors += 1
+            LOGGER.error("Error during API GET call: %s", err)
+            raise StuartEnergyApiClientCommunicationError from err
+        except ClientResponseError as err:
+            success = err.status < HTTPStatus.INTERNAL_SERVER_ERROR
+            metrics.errors += 1
+            LOGGER.error("Error during API GET call: %s", err)
+            raise StuartEnergyApiClientCommunicationError from err
+        except StuartEnergyApiClientCommunicationError as err:
+            success = False
+            metrics.errors += 1
+            LOGGER.error("Error during API GET call: %s", err)
+            raise
+        except Exception as err:
+            success = False
+            metrics.errors += 1
+            LOGGER.error("Error during API GET call: %s", err)
+            raise StuartEnergyApiClientCommunicationError from err
+        else:
+            success = True
+        finally:
+            self.circuit.record(success=success)
+
+        return data
+
+    @staticmethod
+    def _gave_up_error(
+        url: str, status: str
+    ) -> StuartEnergyApiClientCommunicationError:
+        """Return the error for a request that failed on every attempt."""
+        msg = f"Giving up on {url} after {API_MAX_ATTEMPTS} attempts ({status})"
+        if status == str(HTTPStatus.TOO_MANY_REQUESTS):
+            return StuartEnergyApiClientThrottledError(msg)
+        return StuartEnergyApiClientCommunicationError(msg)
+
+    async def _get_with_retries(
+        self, endpoint: str, url: str, params: dict[str, Any] | None = None
+    ) -> Any:
+        """
+        Fetch data from the API within the retry budget.
+
+        Every attempt waits for the shared rate limiter. Throttled (429),
+        server error, timeout and connection failure responses are retried
+        with jitter up to API_MAX_ATTEMPTS attempts, a 429 pausing all callers
+        for its Retry-After. Only the HTTP exchange of an attempt is limited
+        to API_REQUEST_TIMEOUT, not the waits for the limiter. An unauthorized
+        response renews the token once.
+
+        :param endpoint: Endpoint name the attempts are counted under
+        :param url: API endpoint URL
+        :param params: API query parameters
+        :return: data from the API response
+        """
+        with span("token"):
+            token = await self.auth.get_token()
+        renewed = False
+        status = ""
+        metrics = self.metrics.endpoint(endpoint)
+
+        for attempt in range(1, API_MAX_ATTEMPTS + 1):
+            await self.rate_limiter.async_acquire()
+            if attempt > 1:
+                metrics.retries += 1
+            metrics.requests += 1
+            started = time.monotonic()
             LOGGER.debug(
                 "Making API request - URL: %s, Params: %s, Site ID: %s",
                 url,
                 params,
                 self.site_id,
             )
-            async with self.session.get(
-                url, headers=headers, params=params
-            ) as response:
-                LOGGER.debug("Request URL: %s", str(response.url))
-                LOGGER.debug("Response status: %s", response.status)
-                raw_data = await response.text()
-                LOGGER.debug("Raw response body: %s", raw_data)
-
-                if response.status == HTTPStatus.TOO_MANY_REQUESTS:
-                    retry_after = int(response.headers.get("Retry-After", 1))
-                    LOGGER.warning(
-                        "Rate limited by API, retrying after %d seconds", retry_after
-                    )
-                    await asyncio.sleep(retry_after)
-                    return await self._get(url, params)
-                if response.status == HTTPStatus.NOT_FOUND:
-                    self._raise_invalid_site_error()
-                if response.status in (HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN):
-                    LOGGER.warning("Unauthorized - refreshing token...")
-                    token = await self.auth.refresh_auth_token()
-                    headers["Authorization"] = f"Bearer {token}"
-                    async with self.session.get(
-                        url, headers=headers, params=params
-                    ) as retry_response:
-                        retry_response.raise_for_status()
-                        return await retry_response.json()
-
-                response.raise_for_status()
-                return await response.json()
+            try:
+                with span(endpoint) as request_span:
+                    async with (
+                        asyncio.timeout(API_REQUEST_TIMEOUT),
+                        self.session.get(
+                            url, headers=self._headers(token), params=params
+                        ) as response,
+                    ):
+                        LOGGER.debug("Response status %s for %s", response.status, url)
+                        request_span.set(attempt=attempt, status=response.status)
+                        await self._async_log_body(response)
 
-        except Exception as err:
-            LOGGER.error("Error during API GET call: %s", err)
-            raise StuartEnergyApiClientCommunicationError from err
+                        if response.status == HTTPStatus.NOT_FOUND:
+                            self._raise_invalid_site_error()
+                        if (
+                            response.status
+                            in (HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN)
+                            and not renewed
+                        ):
+                            LOGGER.warning("Unauthorized - refreshing token...")
+                            token = await self.auth.async_renew_token(token)
+                            renewed = True
+                            status = str(response.status)
+                            continue
+                        if response.status == HTTPStatus.TOO_MANY_REQUESTS:
+                            metrics.throttled += 1
+                            retry_after = self._retry_after(response)
+                            LOGGER.warning(
+                                "Rate limited by API, retrying after %d seconds",
+                                retry_after,
+                            )
+                            self.rate_limiter.pause(retry_after)
+                            delay = random.uniform(0, API_RETRY_JITTER)  # noqa: S311
+                        elif response.status >= HTTPStatus.INTERNAL_SERVER_ERROR:
+                            delay = self._backoff(attempt)
+                        else:
+                            response.raise_for_status()
+                            body = await response.read()
+                            metrics.bytes_received += len(body)
+                            return json_loads(body)
+                        status = str(response.status)
+            except (ClientConnectionError, TimeoutError) as err:
+                delay = self._backoff(attempt)
+                status = type(err).__name__
+            finally:
+                metrics.latency.observe(time.monotonic() - started)
+
+            if attempt < API_MAX_ATTEMPTS:
+                LOGGER.debug(
+                    "Retrying %s after %s in %.1f seconds (%d/%d)",
+                    url,
+                    status,
+                    delay,
+                    attempt,
+                    API_MAX_ATTEMPTS,
+                )
+                await asyncio.sleep(delay)
+
+        raise self._gave_up_error(url, status)
 
     async def async_get_energy_data(
-        self, date_from: str, date_to: str, aggregate_type: str = "Hour"
-    ) -> Any | None:
+        self, date_from: str, date_to: str, aggregate_type: str = AGGREGATE_HOUR
+    ) -> SolarStats:
         """
         Fetch energy data from the API.
 
         :param date_from: Start date for data retrieval
         :param date_to: End date for data retrieval
-        :param aggregate_type: Aggregation type (default is "Hour")
-        :return: JSON response with energy data
+        :param aggregate_type: Aggregation type, "Hour" or "Day"
+        :return: Decoded energy data
         """
-        url = f"{BASE_API_URL}/slink/sites/{self.site_id}/solar-stats"
+        url = f"{self.auth.base_url}/slink/sites/{self.site_id}/solar-stats"
         params = {
             "dateFromLocal": date_from,
             "dateToLocal": date_to,
             "aggregateType": aggregate_type,
         }
-        return await self._get(url, params)
+        data = await self._get("solar_stats", url, params)
+        with span("decode") as decode_span:
+            stats = SolarStats.from_json(data, dt_util.get_default_time_zone())
+            decode_span.set(segments=len(stats.segments))
+        return stats
 
     async def async_get_site_info(self) -> dict | None:
         """
@@ -147,5 +302,5 @@ class StuartEnergyApiClient:
 
         :return: JSON response with site information
         """
-        url = f"{BASE_API_URL}/slink/sites/{self.site_id}"
-        return await self._get(url)
+        url = f"{self.auth.base_url}/slink/sites/{self.site_id}"
+        return await self._get("site_info", url)
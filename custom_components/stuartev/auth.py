@@ -5,28 +5,53 @@ This module handles authentication with the Stuart Energy API, including obtaini
 and refreshing tokens using their authentication service.
 """
 
+import asyncio
+import contextvars
 import time
 from http import HTTPStatus
 from typing import TYPE_CHECKING, Any
+from urllib.parse import urlsplit
 
+from aiohttp import ClientError
+from homeassistant.core import callback
 from homeassistant.helpers import aiohttp_client
+from homeassistant.helpers.event import async_call_later
 
-from .const import AUTH_API_URL, LOGGER, REFRESH_API_URL
+from .const import (
+    AUTH_API_URL,
+    BASE_API_URL,
+    ENDPOINT_AUTH_PATH,
+    ENDPOINT_BASE_PATH,
+    ENDPOINT_REFRESH_PATH,
+    LOGGER,
+    PAYLOAD_LOG_LIMIT,
+    PAYLOAD_LOGGER,
+    REFRESH_API_URL,
+    TOKEN_REFRESH_MARGIN,
+    TOKEN_REFRESH_MIN_DELAY,
+)
+from .metrics import StuartMetrics
+from .tracing import span
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+    from datetime import datetime
+
     from homeassistant.core import HomeAssistant
 
 
 class StuartAuth:
     """Handle authentication with the Stuart Energy API."""
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         hass: HomeAssistant,
         email: str,
         password: str,
         api_key: str,
         session: aiohttp_client.ClientSession | None = None,
+        *,
+        endpoint: str | None = None,
     ) -> None:
         """
         Initialize the StuartAuth.
@@ -36,14 +61,35 @@ class StuartAuth:
         :param password: User password
         :param api_key: API Key
         :param session: Optional aiohttp client session
+        :param endpoint: Optional URL serving all Stuart endpoints, e.g. the
+            local simulator, instead of the public services
         """
+        self.hass = hass
         self.session = session or aiohttp_client.async_get_clientsession(hass)
         self.email = email
         self.password = password
         self.api_key = api_key
+        self.endpoint = endpoint.rstrip("/") if endpoint else None
+        if endpoint := self.endpoint:
+            self.auth_url = f"{endpoint}{ENDPOINT_AUTH_PATH}"
+            self.refresh_url = f"{endpoint}{ENDPOINT_REFRESH_PATH}"
+            self.base_url = f"{endpoint}{ENDPOINT_BASE_PATH}"
+        else:
+            self.auth_url = AUTH_API_URL
+            self.refresh_url = REFRESH_API_URL
+            self.base_url = BASE_API_URL
+        self.metrics = StuartMetrics()
         self.token = None
         self.refresh_token = None
         self.token_expires = 0  # Epoch timestamp
+        self._refresh_task: asyncio.Task[Any | None] | None = None
+        self._unsub_refresh: Callable[[], None] | None = None
+        self._closed = False
+
+    @property
+    def api_host(self) -> str:
+        """Return the host serving the API, limits are shared per host."""
+        return urlsplit(self.base_url).netloc
 
     async def authenticate(self) -> Any | None:
         """
@@ -63,23 +109,35 @@ class StuartAuth:
             "Origin": "https://app.stuart.energy",
         }
         params = {"key": self.api_key}
-        async with self.session.post(
-            AUTH_API_URL, json=payload, headers=headers, params=params
-        ) as response:
-            if response.status == HTTPStatus.OK:
-                data = await response.json()
-                self.token = data.get("token") or data.get("idToken")
-                self.refresh_token = data.get("refreshToken")
-                expires_in = int(data.get("expiresIn", 3600))
-                self.token_expires = time.time() + expires_in - 60
-                return self.token
-            response_text = await response.text()
-            LOGGER.debug("Authentication payload: %s", payload)
-            LOGGER.debug("Authentication response status: %s", response.status)
-            LOGGER.debug("Authentication response headers: %s", response.headers)
-            LOGGER.debug("Authentication response body: %s", response_text)
-            LOGGER.error("Failed to authenticate: %s", response_text)
-            return None
+        metrics = self.metrics.endpoint("sign_in")
+        metrics.requests += 1
+        started = time.monotonic()
+        with span("sign_in"):
+            async with self.session.post(
+                self.auth_url, json=payload, headers=headers, params=params
+            ) as response:
+                metrics.bytes_received += len(await response.read())
+                metrics.latency.observe(time.monotonic() - started)
+                if response.status == HTTPStatus.OK:
+                    data = await response.json()
+                    self.token = data.get("token") or data.get("idToken")
+                    self.refresh_token = data.get("refreshToken")
+                    expires_in = int(data.get("expiresIn", 3600))
+                    self.token_expires = time.time() + expires_in - 60
+                    return self.token
+                metrics.errors += 1
+                response_text = await response.text()
+                PAYLOAD_LOGGER.debug(
+                    "Authentication response %s for %s: %.*s",
+                    response.status,
+                    self.email,
+                    PAYLOAD_LOG_LIMIT,
+                    response_text,
+                )
+                LOGGER.error(
+                    "Failed to authenticate: %.*s", PAYLOAD_LOG_LIMIT, response_text
+                )
+        return None
 
     async def refresh_auth_token(self) -> Any | None:
         """
@@ -102,18 +160,25 @@ class StuartAuth:
             "Origin": "https://app.stuart.energy",
         }
         params = {"key": self.api_key}
-        async with self.session.post(
-            REFRESH_API_URL, json=payload, headers=headers, params=params
-        ) as response:
-            if response.status == HTTPStatus.OK:
-                data = await response.json()
-                self.token = data.get("id_token")
-                self.refresh_token = data.get("refresh_token")
-                expires_in = int(data.get("expires_in", 3600))
-                self.token_expires = time.time() + expires_in - 60
-                return self.token
-            LOGGER.error("Failed to refresh token: %s", await response.text())
-            return await self.authenticate()
+        metrics = self.metrics.endpoint("token_refresh")
+        metrics.requests += 1
+        started = time.monotonic()
+        with span("token_refresh"):
+            async with self.session.post(
+                self.refresh_url, json=payload, headers=headers, params=params
+            ) as response:
+                metrics.bytes_received += len(await response.read())
+                metrics.latency.observe(time.monotonic() - started)
+                if response.status == HTTPStatus.OK:
+                    data = await response.json()
+                    self.token = data.get("id_token")
+                    self.refresh_token = data.get("refresh_token")
+                    expires_in = int(data.get("expires_in", 3600))
+                    self.token_expires = time.time() + expires_in - 60
+                    return self.token
+                metrics.errors += 1
+                LOGGER.error("Failed to refresh token: %s", await response.text())
+        return await self.authenticate()
 
     async def get_token(self) -> Any | None:
         """
@@ -123,5 +188,89 @@ class StuartAuth:
         """
         if not self.token or time.time() >= self.token_expires:
             LOGGER.info("Token expired or missing, refreshing...")
-            return await self.refresh_auth_token()
+            return await self._async_refresh_shared()
         return self.token
+
+    async def async_renew_token(self, rejected_token: Any) -> Any | None:
+        """
+        Return a new token after the API rejected ``rejected_token``.
+
+        If another caller already replaced the rejected token, the current
+        token is returned without refreshing again.
+
+        :param rejected_token: Token the API answered 401/403 to
+        :return: Valid authentication token
+        """
+        if self.token and self.token != rejected_token:
+            return self.token
+        self.token_expires = 0
+        return await self._async_refresh_shared()
+
+    async def _async_refresh_shared(self) -> Any | None:
+        """
+        Refresh the token, sharing a single in-flight refresh between callers.
+
+        Waiters are shielded from each other, so a cancelled caller does not
+        cancel the refresh the others are waiting for.
+        """
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._async_refresh())
+        return await asyncio.shield(self._refresh_task)
+
+    async def _async_refresh(self) -> Any | None:
+        """Refresh the token and schedule the next proactive refresh."""
+        token = await self.refresh_auth_token()
+        if token:
+            self._schedule_refresh()
+        return token
+
+    def _schedule_refresh(self) -> None:
+        """
+        Schedule a background refresh shortly before the token expires.
+
+        Short-lived tokens are refreshed halfway through their lifetime, and
+        never sooner than TOKEN_REFRESH_MIN_DELAY, so a token that expires
+        within the margin does not refresh in a loop. Nothing is scheduled
+        once the entry is unloaded.
+        """
+        self._async_cancel_timer()
+        if self._closed:
+            return
+        lifetime = max(0.0, self.token_expires - time.time())
+        margin = min(TOKEN_REFRESH_MARGIN, lifetime / 2)
+        delay = max(TOKEN_REFRESH_MIN_DELAY, lifetime - margin)
+        # The timer is armed in an empty context, so the proactive refresh
+        # does not join the trace of the poll that signed in.
+        self._unsub_refresh = contextvars.Context().run(
+            async_call_later, self.hass, delay, self._async_handle_refresh_timer
+        )
+
+    @callback
+    def _async_handle_refresh_timer(self, _now: datetime) -> None:
+        """Start the proactive refresh."""
+        self._unsub_refresh = None
+        self.hass.async_create_background_task(
+            self._async_proactive_refresh(), name="stuartev token refresh"
+        )
+
+    async def _async_proactive_refresh(self) -> None:
+        """Refresh the token ahead of expiry, leaving failures to get_token."""
+        try:
+            await self._async_refresh_shared()
+        except (ClientError, TimeoutError) as err:
+            LOGGER.warning("Proactive token refresh failed: %s", err)
+
+    @callback
+    def async_cancel_refresh(self) -> None:
+        """Cancel proactive refreshes for good, when the entry is unloaded."""
+        self._closed = True
+        self._async_cancel_timer()
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
+
+    @callback
+    def _async_cancel_timer(self) -> None:
+        """Cancel the scheduled proactive refresh."""
+        if self._unsub_refresh:
+            self._unsub_refresh()
+            self._unsub_refresh = None
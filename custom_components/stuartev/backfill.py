@@ -0,0 +1,456 @@
+"""
+Historical backfill for Stuart Energy integration.
+
+Fetches solar statistics for a range of past days in multi-day windows with
+bounded concurrency and imports the whole range in a single pass, or only the
+days the recorder is missing.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from datetime import date, datetime, time, timedelta
+from typing import TYPE_CHECKING
+
+from .const import (
+    AGGREGATE_DAY,
+    AGGREGATE_HOUR,
+    BACKFILL_DAY_CHUNK_DAYS,
+    DATETIME_FORMAT_LOCAL,
+    LOGGER,
+    REPAIR_MERGE_DAYS,
+)
+from .exceptions import (
+    StuartEnergyApiClientCircuitOpenError,
+    StuartEnergyApiClientCommunicationError,
+    StuartEnergyApiClientThrottledError,
+)
+from .tracing import span
+
+if TYPE_CHECKING:
+    from .api import StuartEnergyApiClient
+    from .cache import StuartEnergyHistoryCache
+    from .importer import StuartEnergyImporter
+    from .models import EnergySegments, SolarStats
+
+DAY_END = time(23, 59, 59)
+TRUNCATION_TOLERANCE_KWH = 0.01
+
+
+class StuartEnergyBackfillTruncatedError(Exception):
+    """Exception to indicate the API returned fewer segments than announced."""
+
+    def __init__(self, segments: EnergySegments) -> None:
+        """Initialize the error with the partial segments."""
+        super().__init__("Truncated solar-stats response")
+        self.segments = segments
+
+
+class StuartEnergyBackfill:
+    """Fetch historical windows concurrently and import them in one pass."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        api: StuartEnergyApiClient,
+        importer: StuartEnergyImporter,
+        concurrency: int,
+        chunk_days: int,
+        cache: StuartEnergyHistoryCache | None = None,
+        *,
+        hourly_days: int | None = None,
+    ) -> None:
+        """
+        Initialize the backfill.
+
+        :param api: API client used to fetch solar statistics
+        :param importer: Importer receiving the fetched segments
+        :param concurrency: Maximum number of requests in flight
+        :param chunk_days: Number of days requested per call, shrunk on failure
+        :param cache: Optional cache of closed days, read before fetching
+        :param hourly_days: Number of most recent days fetched per hour, older
+            days are fetched as daily totals. None fetches every day per hour.
+        """
+        self.api = api
+        self.importer = importer
+        self.concurrency = max(1, concurrency)
+        self.chunk_days = max(1, chunk_days)
+        self.cache = cache
+        self.hourly_days = hourly_days
+        self.request_count = 0
+        # Days still incomplete after splitting, imported but never cached.
+        self._truncated_days: set[date] = set()
+        self.days_total = 0
+        self.days_done = 0
+
+    @staticmethod
+    def _is_truncated(stats: SolarStats) -> bool:
+        """Return True if the segments do not add up to the announced total."""
+        if stats.total_kwh is None:
+            return False
+        return abs(stats.total_kwh - stats.segments.total_kwh) > max(
+            TRUNCATION_TOLERANCE_KWH, abs(stats.total_kwh) * 0.001
+        )
+
+    async def _async_request_window(
+        self, first_day: date, last_day: date, aggregate_type: str
+    ) -> EnergySegments:
+        """Request the energy segments from ``first_day`` to ``last_day``."""
+        self.request_count += 1
+        with span("window") as window_span:
+            window_span.set(
+                first_day=first_day.isoformat(),
+                last_day=last_day.isoformat(),
+                aggregate_type=aggregate_type,
+            )
+            # Requests are timed out per attempt by the client, so waiting
+            # for the rate limiter or a Retry-After pause never times out.
+            stats = await self.api.async_get_energy_data(
+                date_from=datetime.combine(first_day, time.min).strftime(
+                    DATETIME_FORMAT_LOCAL
+                ),
+                date_to=datetime.combine(last_day, DAY_END).strftime(
+                    DATETIME_FORMAT_LOCAL
+                ),
+                aggregate_type=aggregate_type,
+            )
+        if self._is_truncated(stats):
+            raise StuartEnergyBackfillTruncatedError(stats.segments)
+        return stats.segments
+
+    async def _async_fetch_window(
+        self, first_day: date, days: int, aggregate_type: str = AGGREGATE_HOUR
+    ) -> EnergySegments:
+        """
+        Fetch the energy segments of ``days`` days starting at ``first_day``.
+
+        A window the API rejects, times out on or truncates is split in half
+        and both halves are fetched on their own. Single days are not split
+        further and errors on them are propagated, as are throttling and an
+        open circuit, which smaller windows do not help with.
+        """
+        last_day = first_day + timedelta(days=days - 1)
+        try:
+            return await self._async_request_window(first_day, last_day, aggregate_type)
+        except StuartEnergyBackfillTruncatedError as err:
+            if days == 1:
+                LOGGER.warning(
+                    "Stuart returned an incomplete day for %s, importing as is",
+                    first_day,
+                )
+                self._truncated_days.add(first_day)
+                return err.segments
+            reason = "truncated"
+        except (
+            StuartEnergyApiClientCircuitOpenError,
+            StuartEnergyApiClientThrottledError,
+        ):
+            # Smaller windows will not help while the API is down, and would
+            # only add requests while it asks for fewer.
+            raise
+        except StuartEnergyApiClientCommunicationError as err:
+            if days == 1:
+                raise
+            reason = type(err).__name__
+
+        half = days // 2
+        if aggregate_type == AGGREGATE_HOUR and half < self.chunk_days:
+            self.chunk_days = half
+            LOGGER.info(
+                "Window %s -> %s failed (%s), reducing chunk size to %d days",
+                first_day,
+                last_day,
+                reason,
+                half,
+            )
+        head = await self._async_fetch_window(first_day, half, aggregate_type)
+        head.extend(
+            await self._async_fetch_window(
+                first_day + timedelta(days=half), days - half, aggregate_type
+            )
+        )
+        return head
+
+    def _missing_runs(
+        self,
+        first_day: date,
+        last_day: date,
+        hourly_data: dict[datetime, float],
+        daily_until: date,
+    ) -> deque[tuple[date, date, str]]:
+        """
+        Load cached days into ``hourly_data`` and return the days still missing.
+
+        :param daily_until: First day fetched per hour, earlier days are
+            fetched as daily totals
+        :return: Contiguous ranges of days that have to be fetched, with the
+            aggregation to request them in
+        """
+        runs: deque[tuple[date, date, str]] = deque()
+        day = first_day
+        while day <= last_day:
+            cached = self.cache.get_day(day) if self.cache else None
+            aggregate_type = AGGREGATE_DAY if day < daily_until else AGGREGATE_HOUR
+            if cached is not None:
+                hourly_data.update(cached)
+            elif (
+                runs
+                and runs[-1][1] == day - timedelta(days=1)
+                and runs[-1][2] == aggregate_type
+            ):
+                runs[-1] = (runs[-1][0], day, aggregate_type)
+            else:
+                runs.append((day, day, aggregate_type))
+            day += timedelta(days=1)
+        return runs
+
+    async def _async_daily_until(self, first_day: date, end: datetime) -> date:
+        """
+        Return the first day to fetch per hour.
+
+        Days before the hourly window are fetched as daily totals, each stored
+        as one statistics row at the start of the day. This is limited to days
+        before the first one the recorder already holds, so hourly rows are
+        never replaced by coarser ones in the middle of the sum chain.
+        """
+        if self.hourly_days is None:
+            return first_day
+        hourly_from = end.date() - timedelta(days=self.hourly_days)
+        if hourly_from <= first_day:
+            return first_day
+        first_recorded = await self.importer.async_get_first_recorded_day(
+            datetime.combine(first_day, time.min, tzinfo=end.tzinfo),
+            datetime.combine(hourly_from, time.min, tzinfo=end.tzinfo),
+        )
+        if first_recorded is None:
+            return hourly_from
+        return max(first_day, min(hourly_from, first_recorded))
+
+    def _cache_closed_days(
+        self, window_hourly: dict[datetime, float], now: datetime
+    ) -> None:
+        """
+        Store the closed days of a fetched window in the cache.
+
+        Truncated days are left out, as are days missing hours, which the
+        cache refuses, so they are fetched again by the next import.
+        """
+        if self.cache is None:
+            return
+        by_day: dict[date, dict[datetime, float]] = {}
+        for hour_start, total_kwh in window_hourly.items():
+            by_day.setdefault(hour_start.date(), {})[hour_start] = total_kwh
+        for day, day_hourly in by_day.items():
+            if day not in self._truncated_days and self.cache.is_closed(day, now):
+                self.cache.put_day(day, day_hourly)
+
+    @property
+    def progress(self) -> dict[str, int]:
+        """Return the progress of the running import."""
+        return {
+            "days_total": self.days_total,
+            "days_done": self.days_done,
+            "requests": self.request_count,
+            "chunk_days": self.chunk_days,
+        }
+
+    async def async_run(self, end: datetime, days: int) -> None:
+        """
+        Import the N days preceding ``end``.
+
+        Closed days found in the cache are not requested again. The remaining
+        days are fetched in windows, up to ``concurrency`` at once. Each result
+        is aggregated into hourly buckets as it arrives and the whole range is
+        handed to the importer once all windows are in, so the starting sum
+        is looked up only once.
+
+        :param end: Reference time, the day containing it is not imported
+        :param days: Number of days to import
+        """
+        last_day = end.date() - timedelta(days=1)
+        first_day = end.date() - timedelta(days=days)
+        initial_chunk_days = self.chunk_days
+        hourly_data: dict[datetime, float] = {}
+        daily_until = await self._async_daily_until(first_day, end)
+        runs = self._missing_runs(first_day, last_day, hourly_data, daily_until)
+        missing_days = self._count_days(runs)
+        self.days_total = days
+        self.days_done = days - missing_days
+        LOGGER.info(
+            "Importing %d days of Stuart history, %d to fetch (%d as daily totals)",
+            days,
+            missing_days,
+            self._count_days(runs, AGGREGATE_DAY),
+        )
+        await self._async_fetch_runs(runs, end, hourly_data)
+
+        if hourly_data:
+            with span("import"):
+                await self.importer.import_hourly(hourly_data)
+        else:
+            LOGGER.warning("No energy segments available to import.")
+
+        LOGGER.info(
+            "Backfilled %d days (%d from cache) in %d requests "
+            "(chunk size %d -> %d days, concurrency %d)",
+            days,
+            days - missing_days,
+            self.request_count,
+            initial_chunk_days,
+            self.chunk_days,
+            self.concurrency,
+        )
+
+    async def async_repair(self, end: datetime, days: int) -> None:
+        """
+        Import only the days of the N days preceding ``end`` the recorder lacks.
+
+        The recorder is scanned once for days with missing or zero-filled
+        hours. Gaps at most REPAIR_MERGE_DAYS apart are joined into one window,
+        trading a few days fetched again for fewer requests, and each window
+        is imported on its own so the recorded hours between windows keep
+        their sums.
+
+        :param end: Reference time, the day containing it is not checked
+        :param days: Number of days to check
+        """
+        last_day = end.date() - timedelta(days=1)
+        first_day = end.date() - timedelta(days=days)
+        with span("gap_scan") as scan_span:
+            gap_days = await self.importer.async_find_gap_days(
+                first_day, last_day, self.cache if self.cache is not None else ()
+            )
+            windows = self._gap_windows(gap_days)
+            scan_span.set(gap_days=len(gap_days), windows=len(windows))
+        self.days_total = days
+        if not windows:
+            self.days_done = days
+            LOGGER.info("No gaps found in %d days of Stuart history", days)
+            return
+
+        hourly_data: dict[datetime, float] = {}
+        daily_until = await self._async_daily_until(first_day, end)
+        runs: deque[tuple[date, date, str]] = deque()
+        for window_start, window_end in windows:
+            runs.extend(
+                self._missing_runs(window_start, window_end, hourly_data, daily_until)
+            )
+        self.days_done = days - self._count_days(runs)
+        LOGGER.info(
+            "Repairing %d missing days of Stuart history in %d windows, "
+            "%d days to fetch",
+            len(gap_days),
+            len(windows),
+            self._count_days(runs),
+        )
+        await self._async_fetch_runs(runs, end, hourly_data)
+
+        with span("import"):
+            for window_start, window_end in windows:
+                window_hourly = {
+                    hour_start: total_kwh
+                    for hour_start, total_kwh in hourly_data.items()
+                    if window_start <= hour_start.date() <= window_end
+                }
+                if not window_hourly:
+                    continue
+                await self.importer.import_hourly(window_hourly)
+                # The next window starts from the sums written for this one.
+                await self.importer.async_wait_for_recorder()
+
+        LOGGER.info(
+            "Repaired %d days of Stuart history in %d requests",
+            len(gap_days),
+            self.request_count,
+        )
+
+    @staticmethod
+    def _gap_windows(gap_days: list[date]) -> list[tuple[date, date]]:
+        """Join sorted gap days at most REPAIR_MERGE_DAYS apart into windows."""
+        windows: list[tuple[date, date]] = []
+        for day in gap_days:
+            if windows and (day - windows[-1][1]).days <= REPAIR_MERGE_DAYS + 1:
+                windows[-1] = (windows[-1][0], day)
+            else:
+                windows.append((day, day))
+        return windows
+
+    @staticmethod
+    def _count_days(
+        runs: deque[tuple[date, date, str]], aggregate_type: str | None = None
+    ) -> int:
+        """Return the number of days in ``runs``, optionally of one aggregation."""
+        return sum(
+            (run_end - run_start).days + 1
+            for run_start, run_end, run_type in runs
+            if aggregate_type in (None, run_type)
+        )
+
+    async def _async_fetch_runs(
+        self,
+        runs: deque[tuple[date, date, str]],
+        end: datetime,
+        hourly_data: dict[datetime, float],
+    ) -> None:
+        """
+        Fetch the days of ``runs`` and add their hourly totals to ``hourly_data``.
+
+        Windows are requested up to ``concurrency`` at once and aggregated as
+        they arrive. ``runs`` is consumed.
+        """
+        pending: deque[tuple[asyncio.Task[EnergySegments], int, str]] = deque()
+
+        def _schedule_next() -> None:
+            # The window size is read on every call, so a shrink caused by an
+            # earlier failure applies to all windows not requested yet.
+            if not runs:
+                return
+            run_start, run_end, aggregate_type = runs[0]
+            chunk_days = (
+                BACKFILL_DAY_CHUNK_DAYS
+                if aggregate_type == AGGREGATE_DAY
+                else self.chunk_days
+            )
+            window_days = min(chunk_days, (run_end - run_start).days + 1)
+            pending.append(
+                (
+                    asyncio.create_task(
+                        self._async_fetch_window(run_start, window_days, aggregate_type)
+                    ),
+                    window_days,
+                    aggregate_type,
+                )
+            )
+            next_day = run_start + timedelta(days=window_days)
+            if next_day > run_end:
+                runs.popleft()
+            else:
+                runs[0] = (next_day, run_end, aggregate_type)
+
+        for _ in range(self.concurrency):
+            _schedule_next()
+
+        try:
+            while pending:
+                task, window_days, aggregate_type = pending.popleft()
+                segments = await task
+                # Keep the network busy while this window is aggregated.
+                _schedule_next()
+                with span("aggregate"):
+                    window_hourly = self.importer.aggregate_segments(segments)
+                    if aggregate_type == AGGREGATE_HOUR:
+                        self._cache_closed_days(window_hourly, end)
+                hourly_data.update(window_hourly)
+                self.days_done += window_days
+                LOGGER.debug(
+                    "History import progress: %d/%d days",
+                    self.days_done,
+                    self.days_total,
+                )
+        finally:
+            for task, _, _ in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(
+                    *(task for task, _, _ in pending), return_exceptions=True
+                )
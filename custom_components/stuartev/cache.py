@@ -0,0 +1,174 @@
+"""
+History cache for Stuart Energy integration.
+
+Keeps the hourly energy of closed days on disk, so backfills and restarts do
+not download days that can no longer change.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlsplit
+
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+from homeassistant.util import slugify
+
+from .const import (
+    DOMAIN,
+    HISTORY_CACHE_MAX_DAYS,
+    HISTORY_CACHE_SAVE_DELAY,
+    HISTORY_CACHE_SETTLE,
+    HISTORY_CACHE_VERSION,
+    LOGGER,
+)
+from .models import local_day_hour_count
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+HOUR_SECONDS = 3600
+
+
+def history_store_key(site_id: str, endpoint: str | None = None) -> str:
+    """
+    Return the storage key of the history cache of a site.
+
+    Sites behind an API endpoint override are also keyed by its host, so
+    history served by e.g. the simulator never mixes with the real one.
+
+    :param site_id: Site the cached days belong to
+    :param endpoint: API endpoint override, None for the Stuart services
+    :return: Storage key
+    """
+    if not endpoint:
+        return f"{DOMAIN}.history.{site_id}"
+    host = urlsplit(endpoint).netloc or endpoint
+    return f"{DOMAIN}.history.{slugify(host)}.{site_id}"
+
+
+class StuartEnergyHistoryCache:
+    """
+    Persist hourly energy of closed days per site.
+
+    Each day is stored as ``[first_hour_epoch, [kwh, ...]]`` where the list
+    holds one value per hour from the first hour on, and ``None`` marks hours
+    without data. Only days with all their hours are stored and read back,
+    and only the newest ``max_days`` days are kept.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        site_id: str,
+        max_days: int = HISTORY_CACHE_MAX_DAYS,
+        *,
+        endpoint: str | None = None,
+    ) -> None:
+        """
+        Initialize the cache.
+
+        :param hass: Home Assistant instance
+        :param site_id: Site the cached days belong to
+        :param max_days: Number of days kept before the oldest are evicted
+        :param endpoint: API endpoint override the site is fetched from
+        """
+        self._store: Store[dict[str, Any]] = Store(
+            hass, HISTORY_CACHE_VERSION, history_store_key(site_id, endpoint)
+        )
+        self.max_days = max_days
+        self._days: dict[str, list[Any]] = {}
+
+    async def async_load(self) -> None:
+        """Load cached days from storage."""
+        data = await self._store.async_load()
+        self._days = data.get("days", {}) if data else {}
+        LOGGER.debug("Loaded %d cached days of Stuart history", len(self._days))
+
+    @staticmethod
+    def is_closed(day: date, now: datetime) -> bool:
+        """Return True if the day ended long enough ago to be cached."""
+        next_midnight = datetime.combine(
+            day + timedelta(days=1), datetime.min.time(), tzinfo=now.tzinfo
+        )
+        return now - next_midnight >= HISTORY_CACHE_SETTLE
+
+    def _complete_day(self, day: date) -> list[Any] | None:
+        """
+        Return the cached entry of a day if it holds every hour of the day.
+
+        Entries with missing hours are ignored, so such days are fetched
+        again instead of being served from the cache.
+        """
+        if (cached := self._days.get(day.isoformat())) is None:
+            return None
+        hours = sum(value is not None for value in cached[1])
+        if hours < local_day_hour_count(day, dt_util.get_default_time_zone()):
+            return None
+        return cached
+
+    def __contains__(self, day: object) -> bool:
+        """Return True if the day is cached with all its hours."""
+        return isinstance(day, date) and self._complete_day(day) is not None
+
+    def get_day(self, day: date) -> dict[datetime, float] | None:
+        """
+        Return the cached hourly energy of a day.
+
+        :param day: Local calendar day
+        :return: Energy generated per hour start, None if the day is not
+            cached or misses hours
+        """
+        if (cached := self._complete_day(day)) is None:
+            return None
+        first_hour, values = cached
+        return {
+            dt_util.as_local(
+                dt_util.utc_from_timestamp(first_hour + index * HOUR_SECONDS)
+            ): value
+            for index, value in enumerate(values)
+            if value is not None
+        }
+
+    def put_day(self, day: date, hourly_data: dict[datetime, float]) -> None:
+        """
+        Store the hourly energy of a closed day.
+
+        Days missing hours are not stored, so they are fetched again.
+
+        :param day: Local calendar day
+        :param hourly_data: Energy generated per hour start within the day
+        """
+        if len(hourly_data) < local_day_hour_count(
+            day, dt_util.get_default_time_zone()
+        ):
+            LOGGER.debug("Not caching %s, it misses hours", day)
+            return
+        first_hour = int(min(hourly_data).timestamp())
+        last_hour = int(max(hourly_data).timestamp())
+        values: list[float | None] = [None] * (
+            (last_hour - first_hour) // HOUR_SECONDS + 1
+        )
+        for hour_start, total_kwh in hourly_data.items():
+            index = (int(hour_start.timestamp()) - first_hour) // HOUR_SECONDS
+            values[index] = round(total_kwh, 5)
+
+        self._days[day.isoformat()] = [first_hour, values]
+        if len(self._days) > self.max_days:
+            for evicted in sorted(self._days)[: len(self._days) - self.max_days]:
+                del self._days[evicted]
+        self._store.async_delay_save(self._data_to_save, HISTORY_CACHE_SAVE_DELAY)
+
+    @staticmethod
+    async def async_remove(
+        hass: HomeAssistant, site_id: str, endpoint: str | None = None
+    ) -> None:
+        """Remove the stored history of a site."""
+        await Store(
+            hass, HISTORY_CACHE_VERSION, history_store_key(site_id, endpoint)
+        ).async_remove()
+
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the data to persist."""
+        return {"days": self._days}
@@ -0,0 +1,99 @@
+"""
+Circuit breaker for Stuart Energy integration.
+
+Stops sending requests to an API host after repeated failures and probes it
+with a single request once the reset timeout has passed.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+from .const import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT, DOMAIN, LOGGER
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+CIRCUIT_BREAKER_KEY = f"{DOMAIN}_circuit_breaker"
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class StuartCircuitBreaker:
+    """Closed/open/half-open circuit breaker around the Stuart API."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        """
+        Initialize the circuit breaker.
+
+        :param failure_threshold: Consecutive failures that open the circuit
+        :param reset_timeout: Seconds the circuit stays open before a probe
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent now."""
+        if self.state == STATE_CLOSED:
+            return True
+        if self.state == STATE_OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            LOGGER.info("Probing the Stuart API after %ds", self.reset_timeout)
+            self.state = STATE_HALF_OPEN
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record(self, *, success: bool | None) -> None:
+        """
+        Record the outcome of an allowed request.
+
+        :param success: True if the API answered, False if it failed and None
+            if the request was abandoned without an outcome
+        """
+        self._probe_in_flight = False
+        if success is None:
+            return
+        if success:
+            if self.state != STATE_CLOSED:
+                LOGGER.info("Stuart API is reachable again, closing the circuit")
+            self.state = STATE_CLOSED
+            self.failures = 0
+            return
+
+        self.failures += 1
+        if self.state == STATE_HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != STATE_OPEN:
+                LOGGER.warning(
+                    "Stuart API failed %d times, pausing requests for %ds",
+                    self.failures,
+                    self.reset_timeout,
+                )
+            self.state = STATE_OPEN
+            self._opened_at = time.monotonic()
+
+
+def async_get_circuit_breaker(hass: HomeAssistant, host: str) -> StuartCircuitBreaker:
+    """
+    Return the circuit breaker shared by all config entries using an API host.
+
+    :param hass: Home Assistant instance
+    :param host: Host the requests are sent to, e.g. the simulator's
+    """
+    breakers: dict[str, StuartCircuitBreaker] = hass.data.setdefault(
+        CIRCUIT_BREAKER_KEY, {}
+    )
+    if (breaker := breakers.get(host)) is None:
+        breaker = breakers[host] = StuartCircuitBreaker(
+            CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT
+        )
+    return breaker
@@ -18,25 +18,39 @@ from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
 from homeassistant.core import callback
 from homeassistant.helpers import aiohttp_client
 
-from . import DAYS_DEFAULT, DAYS_MAX
-from .api import (
-    StuartEnergyApiClientAuthenticationError,
-    StuartEnergyApiClientCommunicationError,
-)
+from . import parse_site_ids
 from .auth import StuartAuth
 from .const import (
+    ADAPTIVE_POLLING_DEFAULT,
+    BACKFILL_CHUNK_DAYS_DEFAULT,
+    BACKFILL_CHUNK_DAYS_MAX,
+    BACKFILL_CONCURRENCY_DEFAULT,
+    BACKFILL_CONCURRENCY_MAX,
+    CONF_ADAPTIVE_POLLING,
+    CONF_API_ENDPOINT,
     CONF_API_KEY,
+    CONF_HOURLY_HISTORY_DAYS,
+    CONF_TRACING,
+    DAYS_DEFAULT,
+    DAYS_MAX,
     DOMAIN,
+    HOURLY_HISTORY_DAYS_DEFAULT,
     LOGGER,
+    REVISION_OVERLAP_DEFAULT,
+    REVISION_OVERLAP_MAX,
     SCAN_INTERVAL_DEFAULT,
     SCAN_INTERVAL_MAX,
 )
+from .exceptions import (
+    StuartEnergyApiClientAuthenticationError,
+    StuartEnergyApiClientCommunicationError,
+)
 
 
 class StuartEVConfigFlow(ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Stuart Energy."""
 
-    VERSION = 1
+    VERSION = 2
 
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
@@ -44,30 +58,38 @@ class StuartEVConfigFlow(ConfigFlow, domain=DOMAIN):
         """
         Handle the initial step of the config flow.
 
+        In advanced mode an API endpoint override can be set, so an entry can
+        be created against the local simulator without real credentials.
+
         :param user_input: User input from the form
         :return: Config flow result
         """
-        if self._async_current_entries():
-            return self.async_abort(reason="single_instance_allowed")
-
         errors: dict[str, str] = {}
 
         if user_input is not None:
             email = user_input[CONF_EMAIL].strip().lower()
             password = user_input[CONF_PASSWORD]
             api_key = user_input[CONF_API_KEY].strip()
-            site_id = user_input["site_id"]
+            site_ids = parse_site_ids(user_input["site_id"])
             history_days = user_input.get("history_days", DAYS_DEFAULT)
             scan_interval = user_input.get("scan_interval", SCAN_INTERVAL_DEFAULT)
+            endpoint = user_input.get(CONF_API_ENDPOINT, "").strip()
 
+            if not site_ids:
+                errors["site_id"] = "invalid_site_id"
             if not (1 <= history_days <= DAYS_MAX):
                 errors["history_days"] = "invalid_range"
             if not (1 <= scan_interval <= SCAN_INTERVAL_MAX):
                 errors["scan_interval"] = "invalid_range"
 
             if not errors:
+                await self.async_set_unique_id(email)
+                self._abort_if_unique_id_configured()
+
                 session = aiohttp_client.async_get_clientsession(self.hass)
-                auth = StuartAuth(self.hass, email, password, api_key, session)
+                auth = StuartAuth(
+                    self.hass, email, password, api_key, session, endpoint=endpoint
+                )
 
                 try:
                     token = await auth.authenticate()
@@ -78,9 +100,10 @@ class StuartEVConfigFlow(ConfigFlow, domain=DOMAIN):
                                 CONF_EMAIL: email,
                                 CONF_PASSWORD: password,
                                 CONF_API_KEY: api_key,
-                                "site_id": site_id,
+                                "site_id": ",".join(site_ids),
                                 "history_days": history_days,
                                 "scan_interval": scan_interval,
+                                **({CONF_API_ENDPOINT: endpoint} if endpoint else {}),
                             },
                         )
                     errors["base"] = "invalid_auth"
@@ -92,19 +115,19 @@ class StuartEVConfigFlow(ConfigFlow, domain=DOMAIN):
                     errors["base"] = "unknown"
                     LOGGER.error("Unexpected exception: %s", err)
 
+        schema: dict[Any, Any] = {
+            vol.Required(CONF_EMAIL): str,
+            vol.Required(CONF_PASSWORD): str,
+            vol.Required(CONF_API_KEY): str,
+            vol.Required("site_id"): str,
+            vol.Optional("history_days", default=DAYS_DEFAULT): int,
+            vol.Optional("scan_interval", default=SCAN_INTERVAL_DEFAULT): int,
+        }
+        if self.show_advanced_options:
+            schema[vol.Optional(CONF_API_ENDPOINT)] = str
+
         return self.async_show_form(
-            step_id="user",
-            data_schema=vol.Schema(
-                {
-                    vol.Required(CONF_EMAIL): str,
-                    vol.Required(CONF_PASSWORD): str,
-                    vol.Required(CONF_API_KEY): str,
-                    vol.Required("site_id"): str,
-                    vol.Optional("history_days", default=DAYS_DEFAULT): int,
-                    vol.Optional("scan_interval", default=SCAN_INTERVAL_DEFAULT): int,
-                }
-            ),
-            errors=errors,
+            step_id="user", data_schema=vol.Schema(schema), errors=errors
         )
 
     @staticmethod
@@ -130,6 +153,18 @@ class StuartEVOptionsFlow(OptionsFlow):
         """
         self.config_entry = config_entry
 
+    def _current(self, key: str, default: Any) -> Any:
+        """
+        Return the saved value of an option, so saving the form keeps it.
+
+        :param key: Option key
+        :param default: Value used when the option was never set
+        :return: Value from the options, the entry data or the default
+        """
+        return self.config_entry.options.get(
+            key, self.config_entry.data.get(key, default)
+        )
+
     async def async_step_init(
         self, user_input: dict[str, Any] | None = None
     ) -> ConfigFlowResult:
@@ -140,31 +175,61 @@ class StuartEVOptionsFlow(OptionsFlow):
         :return: Form or entry creation result
         """
         if user_input is not None:
-            old_days = self.config_entry.options.get("history_days", DAYS_DEFAULT)
-            new_days = user_input.get("history_days", DAYS_DEFAULT)
-            result: ConfigFlowResult = self.async_create_entry(
-                title="", data=user_input
-            )
-
-            if new_days != old_days:
-
-                async def trigger_import() -> None:
-                    """Trigger import of historical data after option change."""
-                    coordinator = self.hass.data[DOMAIN][self.config_entry.entry_id][
-                        "coordinator"
-                    ]
-                    await coordinator.import_historical_data(new_days)
-
-                self.hass.async_create_task(trigger_import())
-
-            return result
-
-        return self.async_show_form(
-            step_id="init",
-            data_schema=vol.Schema(
-                {
-                    vol.Optional("scan_interval", default=SCAN_INTERVAL_DEFAULT): int,
-                    vol.Optional("history_days", default=DAYS_DEFAULT): int,
-                }
-            ),
-        )
+            # The entry is reloaded with the new options and imports the
+            # history it is missing again on setup.
+            return self.async_create_entry(title="", data=user_input)
+
+        schema: dict[Any, Any] = {
+            vol.Optional(
+                "scan_interval",
+                default=self._current("scan_interval", SCAN_INTERVAL_DEFAULT),
+            ): int,
+            vol.Optional(
+                "history_days", default=self._current("history_days", DAYS_DEFAULT)
+            ): int,
+            vol.Optional(
+                "backfill_concurrency",
+                default=self._current(
+                    "backfill_concurrency", BACKFILL_CONCURRENCY_DEFAULT
+                ),
+            ): vol.All(vol.Coerce(int), vol.Range(min=1, max=BACKFILL_CONCURRENCY_MAX)),
+            vol.Optional(
+                "revision_overlap",
+                default=self._current("revision_overlap", REVISION_OVERLAP_DEFAULT),
+            ): vol.All(vol.Coerce(int), vol.Range(min=0, max=REVISION_OVERLAP_MAX)),
+            vol.Optional(
+                "backfill_chunk_days",
+                default=self._current(
+                    "backfill_chunk_days", BACKFILL_CHUNK_DAYS_DEFAULT
+                ),
+            ): vol.All(vol.Coerce(int), vol.Range(min=1, max=BACKFILL_CHUNK_DAYS_MAX)),
+            vol.Optional(
+                CONF_HOURLY_HISTORY_DAYS,
+                default=self._current(
+                    CONF_HOURLY_HISTORY_DAYS, HOURLY_HISTORY_DAYS_DEFAULT
+                ),
+            ): vol.All(vol.Coerce(int), vol.Range(min=1, max=DAYS_MAX)),
+            vol.Optional(
+                CONF_ADAPTIVE_POLLING,
+                default=self._current(CONF_ADAPTIVE_POLLING, ADAPTIVE_POLLING_DEFAULT),
+            ): bool,
+        }
+        if self.show_advanced_options:
+            schema[
+                vol.Optional(
+                    CONF_API_ENDPOINT,
+                    description={
+                        "suggested_value": self.config_entry.options.get(
+                            CONF_API_ENDPOINT
+                        )
+                    },
+                )
+            ] = str
+            schema[
+                vol.Optional(
+                    CONF_TRACING,
+                    default=self._current(CONF_TRACING, default=False),
+                )
+            ] = bool
+
+        return self.async_show_form(step_id="init", data_schema=vol.Schema(schema))
@@ -6,6 +6,7 @@ including API URLs, domain name, and logger configuration.
 """
 
 import logging
+from datetime import timedelta
 
 DOMAIN = "stuartev"
 
@@ -15,9 +16,63 @@ DAYS_DEFAULT = 30
 DAYS_MAX = 365
 SCAN_INTERVAL_DEFAULT = 3
 SCAN_INTERVAL_MAX = 24
+CONF_ADAPTIVE_POLLING = "adaptive_polling"
+ADAPTIVE_POLLING_DEFAULT = True
+PUBLICATION_LAG_DEFAULT = timedelta(minutes=20)  # Delay until an hour is published
+PUBLICATION_LAG_MIN = timedelta(minutes=5)
+PUBLICATION_LAG_MAX = timedelta(hours=2)
+PUBLICATION_LAG_STEP = timedelta(minutes=5)
+SITE_POLL_CONCURRENCY = 2  # Sites of one entry polled at the same time
+SITE_POLL_SPREAD = timedelta(minutes=15)  # Adaptive polls of the sites spread over
+REVISION_OVERLAP_DEFAULT = 3  # Hours re-fetched before the last processed hour
+REVISION_OVERLAP_MAX = 24
+BACKFILL_CONCURRENCY_DEFAULT = 4
+BACKFILL_CONCURRENCY_MAX = 16
+BACKFILL_CHUNK_DAYS_DEFAULT = 7
+BACKFILL_CHUNK_DAYS_MAX = 31
+CONF_HOURLY_HISTORY_DAYS = "hourly_history_days"
+HOURLY_HISTORY_DAYS_DEFAULT = 31  # Older history is imported as daily totals
+AGGREGATE_HOUR = "Hour"
+AGGREGATE_DAY = "Day"
+BACKFILL_DAY_CHUNK_DAYS = 92  # Days per request when fetching daily totals
+REPAIR_MERGE_DAYS = 2  # Recorded days fetched again to join two gaps
+DERIVED_ROLLING_DAYS = 7  # Days summed by the rolling energy sensor
+STATISTICS_BATCH_SIZE = 2000  # Hourly rows per recorder submit
+IMPORTER_STATE_RETENTION = timedelta(days=3)  # Imported hours remembered
+
+HISTORY_CACHE_VERSION = 1
+HISTORY_CACHE_MAX_DAYS = DAYS_MAX + 31
+HISTORY_CACHE_SAVE_DELAY = 30  # Seconds
+HISTORY_CACHE_SETTLE = timedelta(hours=12)  # Age after which a day is closed
+
+DATETIME_FORMAT_LOCAL = "%Y-%m-%dT%H:%M:%S"
+HOUR_KEY_FORMAT = "%Y-%m-%dT%H"  # Prefix of DATETIME_FORMAT_LOCAL
 
 BASE_API_URL = "https://api.stuart.energy/api"
 AUTH_API_URL = "https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword"
 REFRESH_API_URL = "https://securetoken.googleapis.com/v1/token"
+# Paths below a custom api_endpoint, e.g. the local simulator.
+CONF_API_ENDPOINT = "api_endpoint"
+ENDPOINT_BASE_PATH = "/api"
+ENDPOINT_AUTH_PATH = "/v1/accounts:signInWithPassword"
+ENDPOINT_REFRESH_PATH = "/v1/token"
+API_RATE_LIMIT = 2.0  # Requests per second to the Stuart API host
+API_RATE_BURST = 5
+API_REQUEST_TIMEOUT = 60  # Seconds per attempt, rate limiter waits excluded
+API_MAX_ATTEMPTS = 4  # Attempts per request, including the first one
+API_RETRY_MAX_DELAY = 30  # Seconds, cap of the exponential backoff
+API_RETRY_JITTER = 1.0  # Seconds of jitter added after a Retry-After pause
+CIRCUIT_FAILURE_THRESHOLD = 3  # Failed requests in a row that open the circuit
+CIRCUIT_RESET_TIMEOUT = 300  # Seconds before a single probe request is allowed
+# Upper bounds in seconds of the request and update duration histograms.
+METRICS_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONF_TRACING = "tracing"
+TRACE_BUFFER_SIZE = 20  # Traces kept per config entry
+TRACE_MAX_SPANS = 500  # Spans kept per trace, later ones are counted only
+TOKEN_REFRESH_MARGIN = 300  # Seconds before expiry to refresh in the background
+TOKEN_REFRESH_MIN_DELAY = 30  # Seconds between proactive refreshes at least
 
 LOGGER: logging.Logger = logging.getLogger(DOMAIN)
+# Response bodies are only dumped when this logger is set to debug.
+PAYLOAD_LOGGER: logging.Logger = LOGGER.getChild("payload")
+PAYLOAD_LOG_LIMIT = 2000  # Characters of a response body written to the log
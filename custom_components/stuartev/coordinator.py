@@ -7,51 +7,144 @@ Handles data fetching and coordination for sensor updates and statistics import.
 from __future__ import annotations
 
 import asyncio
-from datetime import datetime, timedelta
+import time
+from datetime import date, datetime, timedelta
 from typing import TYPE_CHECKING, Any
 
-from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_track_time_change
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 from homeassistant.util import dt as dt_util
 
-from .api import StuartEnergyApiClient, StuartEnergyApiClientCommunicationError
-from .const import CONF_API_KEY, DOMAIN, LOGGER, SCAN_INTERVAL_DEFAULT
+from .backfill import StuartEnergyBackfill
+from .cache import StuartEnergyHistoryCache
+from .const import (
+    ADAPTIVE_POLLING_DEFAULT,
+    BACKFILL_CHUNK_DAYS_DEFAULT,
+    BACKFILL_CONCURRENCY_DEFAULT,
+    CONF_ADAPTIVE_POLLING,
+    CONF_HOURLY_HISTORY_DAYS,
+    DATETIME_FORMAT_LOCAL,
+    DERIVED_ROLLING_DAYS,
+    DOMAIN,
+    HOUR_KEY_FORMAT,
+    HOURLY_HISTORY_DAYS_DEFAULT,
+    LOGGER,
+    REVISION_OVERLAP_DEFAULT,
+    SCAN_INTERVAL_DEFAULT,
+    SITE_POLL_SPREAD,
+)
+from .exceptions import (
+    StuartEnergyApiClientCircuitOpenError,
+    StuartEnergyApiClientCommunicationError,
+)
 from .importer import StuartEnergyImporter
+from .metrics import LatencyHistogram
+from .models import DerivedEnergy
+from .scheduler import StuartPollScheduler, sun_was_down
+from .tracing import span
 
 if TYPE_CHECKING:
     from homeassistant.config_entries import ConfigEntry
     from homeassistant.core import HomeAssistant
 
+    from .api import StuartEnergyApiClient
+    from .models import SolarStats
+    from .tracing import StuartTracer
+
 
 class StuartEnergyCoordinator(DataUpdateCoordinator):
     """Coordinator class for Stuart Energy data updates."""
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
-        """Initialize the coordinator."""
+    def __init__(  # noqa: PLR0913
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        api: StuartEnergyApiClient,
+        *,
+        poll_semaphore: asyncio.Semaphore,
+        history_lock: asyncio.Lock,
+        tracer: StuartTracer,
+        stagger: float = 0.0,
+    ) -> None:
+        """
+        Initialize the coordinator for one site.
+
+        :param hass: Home Assistant instance
+        :param entry: Config entry the site belongs to
+        :param api: API client of the site, sharing the entry's authentication
+        :param poll_semaphore: Limits concurrent polls across the entry's sites
+        :param history_lock: Serializes history imports across the entry's sites
+        :param tracer: Tracer of the entry recording polls and history imports
+        :param stagger: Share, from 0 to 1, of the scan interval or with
+            adaptive polling of SITE_POLL_SPREAD the site's polls are delayed
+            by, so the entry's sites do not all poll at once
+        """
+        self._scan_interval = timedelta(
+            hours=entry.options.get(
+                "scan_interval",
+                entry.data.get("scan_interval", SCAN_INTERVAL_DEFAULT),
+            )
+        )
         super().__init__(
             hass,
             LOGGER,
-            name=DOMAIN,
-            update_interval=timedelta(
-                hours=entry.options.get(
-                    "scan_interval",
-                    entry.data.get("scan_interval", SCAN_INTERVAL_DEFAULT),
-                )
-            ),
+            name=f"{DOMAIN} {api.site_id}",
+            update_interval=self._scan_interval * (1 + stagger),
         )
         self.entry = entry
         self.hass = hass
-        self.api = StuartEnergyApiClient(
-            hass,
-            entry.data[CONF_EMAIL],
-            entry.data[CONF_PASSWORD],
-            entry.data[CONF_API_KEY],
-            entry.data["site_id"],
+        self.api = api
+        self._poll_semaphore = poll_semaphore
+        self._history_lock = history_lock
+        self.tracer = tracer
+        self.backfill_concurrency: int = entry.options.get(
+            "backfill_concurrency",
+            entry.data.get("backfill_concurrency", BACKFILL_CONCURRENCY_DEFAULT),
+        )
+        self.backfill_chunk_days: int = entry.options.get(
+            "backfill_chunk_days",
+            entry.data.get("backfill_chunk_days", BACKFILL_CHUNK_DAYS_DEFAULT),
+        )
+        self.hourly_history_days: int = entry.options.get(
+            CONF_HOURLY_HISTORY_DAYS,
+            entry.data.get(CONF_HOURLY_HISTORY_DAYS, HOURLY_HISTORY_DAYS_DEFAULT),
+        )
+        self.revision_overlap = timedelta(
+            hours=entry.options.get(
+                "revision_overlap",
+                entry.data.get("revision_overlap", REVISION_OVERLAP_DEFAULT),
+            )
         )
         self.last_processed_time: datetime | None = None
-        self.last_segments_signature: tuple[tuple[str, float], ...] | None = None
+        self._wide_window_required = True
+        self._window_hourly: dict[datetime, float] = {}
+        self._co2_per_kwh = 0.0
+        # Energy of closed days before yesterday, for the rolling total.
+        self._day_totals: dict[date, float] = {}
+        self.segment_digests: dict[str, bytes] = {}
         self.statistic_id: str | None = None
         self.site_info: dict[str, Any] = {}
+        self.importer: StuartEnergyImporter | None = None
+        self.history_cache = StuartEnergyHistoryCache(
+            hass, api.site_id, endpoint=api.auth.endpoint
+        )
+        self.history_import: StuartEnergyBackfill | None = None
+        self.history_import_state: str = "idle"
+        self._history_task: asyncio.Task[None] | None = None
+        self.update_duration = LatencyHistogram()
+        self.scheduler = (
+            StuartPollScheduler(hass, self._scan_interval, SITE_POLL_SPREAD * stagger)
+            if entry.options.get(
+                CONF_ADAPTIVE_POLLING,
+                entry.data.get(CONF_ADAPTIVE_POLLING, ADAPTIVE_POLLING_DEFAULT),
+            )
+            else None
+        )
+        # Derived values depend on the time as well, refresh them every hour.
+        entry.async_on_unload(
+            async_track_time_change(hass, self._async_hour_started, minute=0, second=0)
+        )
 
     def _generate_statistic_id(self) -> str:
         """Generate a valid statistic_id from site details."""
@@ -67,124 +160,336 @@ class StuartEnergyCoordinator(DataUpdateCoordinator):
         LOGGER.error(message)
         raise UpdateFailed(message) from err
 
-    @staticmethod
-    def _build_segments_signature(
-        segments: list[dict[str, Any]],
-    ) -> tuple[tuple[str, float], ...]:
-        """Build a stable signature for the fetched segment payload."""
-        return tuple(
-            (
-                str(segment.get("dateTimeLocal", "")),
-                round(float(segment.get("energyGeneratedKwh", 0.0)), 5),
-            )
-            for segment in segments
-        )
+    def _merge_segment_digests(
+        self, digests: dict[str, bytes], window_start: datetime, wide_start: datetime
+    ) -> tuple[dict[str, bytes], bool]:
+        """
+        Merge the digests of a fetched window and report whether it changed.
+
+        The stored digests are left alone, they are only replaced once the
+        window is imported so that a failed import is retried on next poll.
+
+        :return: merged digests and True if any hour in the window was added,
+            changed or removed
+        """
+        window_key = window_start.strftime(HOUR_KEY_FORMAT)
+        wide_key = wide_start.strftime(HOUR_KEY_FORMAT)
+        previous = {
+            hour_key: digest
+            for hour_key, digest in self.segment_digests.items()
+            if hour_key >= window_key
+        }
+        merged = {
+            hour_key: digest
+            for hour_key, digest in self.segment_digests.items()
+            if wide_key <= hour_key < window_key
+        }
+        merged.update(digests)
+        return merged, previous != digests
 
     async def initialize_site_info(self) -> None:
-        """Fetch site info and generate statistic ID once."""
+        """Load the history cache, fetch site info and generate statistic ID once."""
+        await self.history_cache.async_load()
         self.site_info = await self.api.async_get_site_info()
         LOGGER.debug("Site info received: %s", self.site_info)
         self.statistic_id = self._generate_statistic_id()
         LOGGER.info("Generated statistic_id: %s", self.statistic_id)
+        self.importer = StuartEnergyImporter(
+            self.hass, self.site_info, self.statistic_id
+        )
 
     async def _async_update_data(self) -> dict[str, Any]:
         """Fetch the latest energy data and site info."""
+        if self.data is not None and self.scheduler is None:
+            # Polls after the first one drop the stagger offset again.
+            self.update_interval = self._scan_interval
+        started = time.monotonic()
         try:
-            return await self._fetch_data_with_retries()
+            async with self._poll_semaphore:
+                with self.tracer.trace("poll", site_id=self.api.site_id):
+                    data = await self._fetch_data()
         except StuartEnergyApiClientCommunicationError as err:
-            self._raise_update_failed_error(err)
-
-        return {}
-
-    async def _fetch_data_with_retries(self, retries: int = 3) -> dict[str, Any]:
-        """Fetch data with retries in case of temporary failures."""
-        for attempt in range(retries):
-            try:
-                return await self._fetch_data()
-            except StuartEnergyApiClientCommunicationError:
-                if attempt < retries - 1:
-                    LOGGER.warning(
-                        "Temporary failure, retrying... (%d/%d)", attempt + 1, retries
-                    )
-                    await asyncio.sleep(2**attempt)
-                else:
-                    raise
-        return {}
+            # Hours may have been missed, start over from the wide window.
+            self._wide_window_required = True
+            if self.data is None:
+                self._raise_update_failed_error(err)
+            return self._build_stale_data(err)
+        else:
+            if self.scheduler:
+                self.scheduler.observe(
+                    dt_util.now(), max(self._window_hourly, default=None)
+                )
+            return data
+        finally:
+            self.update_duration.observe(time.monotonic() - started)
+            if self.scheduler:
+                self.update_interval = self.scheduler.next_poll_delay(dt_util.now())
+
+    def _build_stale_data(self, err: Exception) -> dict[str, Any]:
+        """Keep serving the last good data, marked with when it went stale."""
+        if self.data.get("stale_since") is None:
+            LOGGER.warning(
+                "Failed to fetch data, keeping values from %s: %s",
+                self.data.get("last_success"),
+                err,
+            )
+        elif not isinstance(err, StuartEnergyApiClientCircuitOpenError):
+            LOGGER.debug("Failed to fetch data, still serving stale values: %s", err)
+        return {
+            **self.data,
+            "stale_since": self.data.get("stale_since") or dt_util.utcnow(),
+        }
+
+    def _poll_window_start(self, now: datetime) -> tuple[datetime, datetime]:
+        """
+        Return the start of the next poll window and of the wide window.
+
+        Polls normally start at the high-water mark minus the revision overlap.
+        The wide window, from yesterday 00:00, is used for the first poll, after
+        a failed poll and whenever the high-water mark is older than it.
+        """
+        wide_start = (now - timedelta(days=1)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        if self._wide_window_required or self.last_processed_time is None:
+            return wide_start, wide_start
+        window_start = self.last_processed_time - self.revision_overlap
+        return max(wide_start, window_start), wide_start
+
+    def _update_window_data(
+        self,
+        stats: SolarStats,
+        hourly_data: dict[datetime, float] | None,
+        window_start: datetime,
+        wide_start: datetime,
+    ) -> None:
+        """
+        Merge the fetched hours into the hourly data since yesterday 00:00.
+
+        ``hourly_data`` is None when the fetched window did not change, then
+        only the hours that dropped out of the wide window are removed. Days
+        that dropped out are kept in the history cache.
+        """
+        self._cache_dropped_days(wide_start)
+        if hourly_data is None:
+            self._window_hourly = {
+                hour_start: total_kwh
+                for hour_start, total_kwh in self._window_hourly.items()
+                if hour_start >= wide_start
+            }
+        elif window_start <= wide_start:
+            self._window_hourly = dict(hourly_data)
+        else:
+            self._window_hourly = {
+                hour_start: total_kwh
+                for hour_start, total_kwh in self._window_hourly.items()
+                if wide_start <= hour_start < window_start
+            }
+            self._window_hourly.update(hourly_data)
+
+        if stats.total_kwh and stats.co2_kg is not None:
+            # Only totals are published for CO2, keep the ratio to scale it to
+            # the hours that were not part of this request.
+            self._co2_per_kwh = stats.co2_kg / stats.total_kwh
+
+    def _cache_dropped_days(self, wide_start: datetime) -> None:
+        """Store the closed days leaving the wide window in the history cache."""
+        now = dt_util.now()
+        by_day: dict[date, dict[datetime, float]] = {}
+        for hour_start, total_kwh in self._window_hourly.items():
+            if hour_start < wide_start:
+                by_day.setdefault(hour_start.date(), {})[hour_start] = total_kwh
+        for day, day_hourly in by_day.items():
+            if self.history_cache.is_closed(day, now):
+                self.history_cache.put_day(day, day_hourly)
+
+    def _rolling_day_totals(self, today: date) -> dict[date, float]:
+        """
+        Return the energy of the days before yesterday in the rolling period.
+
+        Totals are read from the history cache once per day and remembered.
+        """
+        days = [
+            today - timedelta(days=days_ago)
+            for days_ago in range(2, DERIVED_ROLLING_DAYS)
+        ]
+        self._day_totals = {
+            day: total for day, total in self._day_totals.items() if day in days
+        }
+        for day in days:
+            if (
+                day not in self._day_totals
+                and (cached := self.history_cache.get_day(day)) is not None
+            ):
+                self._day_totals[day] = sum(cached.values())
+        return self._day_totals
+
+    def _derive(self) -> DerivedEnergy:
+        """Derive the sensor values from the hourly data held in memory."""
+        now = dt_util.now()
+        return DerivedEnergy.from_hourly(
+            self._window_hourly,
+            now,
+            self._rolling_day_totals(now.date()),
+            sun_down=sun_was_down(self.hass, now),
+        )
+
+    @callback
+    def _async_hour_started(self, _now: datetime) -> None:
+        """
+        Derive the sensor values again when an hour starts.
+
+        Days and the last complete hour move on without a poll, e.g. at
+        midnight or at night when adaptive polling pauses. The data is
+        replaced directly, as async_set_updated_data would also postpone
+        the next poll.
+        """
+        if self.data is None:
+            return
+        self.data = {**self.data, "derived": self._derive()}
+        self.async_update_listeners()
+
+    def _build_data(self) -> dict[str, Any]:
+        """Build the coordinator data from the hourly data since yesterday."""
+        total = sum(self._window_hourly.values())
+        return {
+            "site": self.site_info,
+            "total": total,
+            "co2": total * self._co2_per_kwh,
+            "derived": self._derive(),
+            "last_success": dt_util.utcnow(),
+            "stale_since": None,
+        }
 
     async def _fetch_data(self) -> dict[str, Any]:
         """Actual data fetching logic."""
         now = dt_util.now()
-        yesterday = now - timedelta(days=1)
-        date_from = yesterday.replace(
-            hour=0, minute=0, second=0, microsecond=0
-        ).strftime("%Y-%m-%dT%H:%M:%S")
-        date_to = now.strftime("%Y-%m-%dT%H:%M:%S")
+        window_start, wide_start = self._poll_window_start(now)
+        date_from = window_start.strftime(DATETIME_FORMAT_LOCAL)
+        date_to = now.strftime(DATETIME_FORMAT_LOCAL)
 
         LOGGER.debug(
-            "Fetching Stuart Energy data from %s to %s",
+            "Fetching Stuart Energy data from %s to %s (%s window)",
             date_from,
             date_to,
+            "wide" if window_start <= wide_start else "incremental",
         )
 
-        energy_data = await self.api.async_get_energy_data(
+        stats = await self.api.async_get_energy_data(
             date_from=date_from,
             date_to=date_to,
         )
 
-        total = energy_data.get("totalGeneratedKwh", 0.0)
-        co2 = energy_data.get("co2ReducedKg", 0.0)
-        segments = energy_data.get("energyGeneratedSegments", [])
-        segments_signature = self._build_segments_signature(segments)
-
-        if segments_signature == self.last_segments_signature:
+        with span("digests"):
+            segment_digests, changed = self._merge_segment_digests(
+                stats.digests, window_start, wide_start
+            )
+        if not changed:
             LOGGER.debug(
                 "Skipping statistics import because Stuart payload did not change."
             )
-            return {
-                "site": self.site_info,
-                "total": total,
-                "co2": co2,
-            }
+            self.segment_digests = segment_digests
+            self._wide_window_required = False
+            self._update_window_data(stats, None, window_start, wide_start)
+            return self._build_data()
 
-        importer = StuartEnergyImporter(self.hass, self.site_info, self.statistic_id)
-        last_time = await importer.import_segments(segments)
+        with span("aggregate"):
+            hourly_data = self.importer.aggregate_segments(stats.segments)
+            self._update_window_data(stats, hourly_data, window_start, wide_start)
+        with span("import"):
+            last_time = await self.importer.import_hourly(hourly_data)
+        # Only an imported window counts as processed, after a failed import
+        # the next poll finds it changed and imports it again.
+        self.segment_digests = segment_digests
+        self._wide_window_required = False
         if last_time:
             self.last_processed_time = last_time
-            self.last_segments_signature = segments_signature
             LOGGER.info(
                 "Stored %d new segments. Last segment time: %s",
-                len(segments),
+                len(stats.segments),
                 last_time.isoformat(),
             )
         else:
-            self.last_segments_signature = segments_signature
             LOGGER.debug(
                 "No valid segments were imported for %s -> %s",
                 date_from,
                 date_to,
             )
 
-        return {
-            "site": self.site_info,
-            "total": total,
-            "co2": co2,
-        }
+        return self._build_data()
+
+    @property
+    def history_import_progress(self) -> dict[str, Any]:
+        """Return the state and progress of the latest history import."""
+        progress: dict[str, Any] = {"state": self.history_import_state}
+        if self.history_import:
+            progress.update(self.history_import.progress)
+        return progress
+
+    @callback
+    def async_start_history_import(self, days: int, *, repair: bool = False) -> None:
+        """
+        Start importing history in the background.
+
+        A running import is cancelled first. The task belongs to the config
+        entry, so it is cancelled as well when the entry is unloaded.
+
+        :param days: Number of days to import
+        :param repair: Only import the days the recorder is missing
+        """
+        if self._history_task and not self._history_task.done():
+            LOGGER.info("Cancelling running history import for a new request")
+            self._history_task.cancel()
+        self._history_task = self.entry.async_create_background_task(
+            self.hass,
+            self._async_run_history_import(days, repair=repair),
+            name=f"{DOMAIN} history import {self.api.site_id}",
+        )
+
+    async def _async_run_history_import(self, days: int, *, repair: bool) -> None:
+        """Run a history import after imports of other sites and track its state."""
+        self.history_import_state = "queued"
+        try:
+            async with self._history_lock:
+                self.history_import_state = "running"
+                if repair:
+                    await self.repair_historical_data(days)
+                else:
+                    await self.import_historical_data(days)
+        except asyncio.CancelledError:
+            self.history_import_state = "cancelled"
+            raise
+        except StuartEnergyApiClientCommunicationError as err:
+            self.history_import_state = "failed"
+            LOGGER.error("Stuart Energy history import failed: %s", err)
+            return
+        except Exception:  # noqa: BLE001
+            # Nothing awaits the task, so any error must end its state here.
+            self.history_import_state = "failed"
+            LOGGER.exception("Unexpected error in Stuart Energy history import")
+            return
+
+        self.history_import_state = "done"
+
+    def _create_backfill(self) -> StuartEnergyBackfill:
+        """Create a backfill with the configured concurrency and window sizes."""
+        return StuartEnergyBackfill(
+            self.api,
+            self.importer,
+            self.backfill_concurrency,
+            self.backfill_chunk_days,
+            self.history_cache,
+            hourly_days=self.hourly_history_days,
+        )
 
     async def import_historical_data(self, days: int) -> None:
         """Import historical statistics for the last N days."""
-        end = dt_util.now()
-        importer = StuartEnergyImporter(self.hass, self.site_info, self.statistic_id)
-
-        for days_ago in range(days, 0, -1):
-            day = end - timedelta(days=days_ago)
-            energy_data = await self.api.async_get_energy_data(
-                date_from=day.replace(
-                    hour=0, minute=0, second=0, microsecond=0
-                ).strftime("%Y-%m-%dT%H:%M:%S"),
-                date_to=day.replace(
-                    hour=23, minute=59, second=59, microsecond=0
-                ).strftime("%Y-%m-%dT%H:%M:%S"),
-            )
-            await importer.import_segments(
-                energy_data.get("energyGeneratedSegments", [])
-            )
+        self.history_import = self._create_backfill()
+        with self.tracer.trace("history_import", site_id=self.api.site_id, days=days):
+            await self.history_import.async_run(dt_util.now(), days)
+
+    async def repair_historical_data(self, days: int) -> None:
+        """Import the days of the last N days missing from the recorder."""
+        self.history_import = self._create_backfill()
+        with self.tracer.trace("history_repair", site_id=self.api.site_id, days=days):
+            await self.history_import.async_repair(dt_util.now(), days)
@@ -0,0 +1,82 @@
+"""
+Diagnostics for Stuart Energy integration.
+
+Provides the config entry diagnostics download with the request metrics and
+the state of each site.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
+
+from .circuit import async_get_circuit_breaker
+from .const import CONF_API_KEY, DOMAIN
+
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
+
+    from .coordinator import StuartEnergyCoordinator
+
+TO_REDACT = {CONF_EMAIL, CONF_PASSWORD, CONF_API_KEY}
+
+
+def _site_diagnostics(coordinator: StuartEnergyCoordinator) -> dict[str, Any]:
+    """Return the state and metrics of one site."""
+    data = coordinator.data or {}
+    return {
+        "statistic_id": coordinator.statistic_id,
+        "last_update_success": coordinator.last_update_success,
+        "last_processed_time": coordinator.last_processed_time,
+        "last_success": data.get("last_success"),
+        "stale_since": data.get("stale_since"),
+        "history_import": coordinator.history_import_progress,
+        "update_duration": coordinator.update_duration.as_dict(),
+        "scheduler": coordinator.scheduler.as_dict() if coordinator.scheduler else None,
+        "statistics_rows_imported": (
+            coordinator.importer.rows_written if coordinator.importer else None
+        ),
+        "starting_sum_cache": (
+            {
+                "hits": coordinator.importer.sum_cache_hits,
+                "misses": coordinator.importer.sum_cache_misses,
+            }
+            if coordinator.importer
+            else None
+        ),
+        "api": coordinator.api.metrics.as_dict(),
+    }
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """
+    Return diagnostics for a config entry.
+
+    :param hass: Home Assistant instance
+    :param entry: Config entry to describe
+    :return: Redacted entry settings, request metrics, per-site state and the
+        recorded traces
+    """
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id, {})
+    auth = entry_data.get("auth")
+    circuit = async_get_circuit_breaker(hass, auth.api_host) if auth else None
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": async_redact_data(entry.options, TO_REDACT),
+        },
+        "circuit": (
+            {"state": circuit.state, "failures": circuit.failures} if circuit else None
+        ),
+        "auth": auth.metrics.as_dict() if auth else None,
+        "sites": {
+            site_id: _site_diagnostics(coordinator)
+            for site_id, coordinator in entry_data.get("coordinators", {}).items()
+        },
+        "traces": list(tracer.traces) if (tracer := entry_data.get("tracer")) else [],
+    }
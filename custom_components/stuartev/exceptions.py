@@ -0,0 +1,46 @@
+"""
+Exceptions for Stuart Energy integration.
+
+Kept free of imports, so modules that only need to catch these errors, like
+the config flow, do not load the API client.
+"""
+
+
+class StuartEnergyApiClientError(Exception):
+    """Exception to indicate a general API error."""
+
+
+class StuartEnergyApiClientCommunicationError(
+    StuartEnergyApiClientError,
+):
+    """Exception to indicate a communication error."""
+
+
+class StuartEnergyApiClientCircuitOpenError(
+    StuartEnergyApiClientCommunicationError,
+):
+    """Exception to indicate requests are paused after repeated failures."""
+
+    def __init__(self) -> None:
+        """Initialize the error with a message."""
+        super().__init__("Stuart API circuit is open")
+
+
+class StuartEnergyApiClientThrottledError(
+    StuartEnergyApiClientCommunicationError,
+):
+    """Exception to indicate the API kept throttling a request."""
+
+
+class StuartEnergyApiClientAuthenticationError(
+    StuartEnergyApiClientError,
+):
+    """Exception to indicate an authentication error."""
+
+
+class StuartEnergyApiClientInvalidSiteIDError(StuartEnergyApiClientError):
+    """Exception to indicate an invalid site ID error."""
+
+    def __init__(self) -> None:
+        """Initialize the error with a message."""
+        super().__init__("Invalid site ID")
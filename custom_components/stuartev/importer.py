@@ -6,8 +6,8 @@ Module handles the import of energy statistics from Stuart Energy into Home Assi
 
 from __future__ import annotations
 
-from collections import defaultdict
-from datetime import timedelta
+import asyncio
+from datetime import datetime, time, timedelta
 from functools import partial
 from typing import TYPE_CHECKING, Any
 
@@ -22,17 +22,31 @@ from homeassistant.components.recorder.statistics import (
     statistics_during_period,
 )
 from homeassistant.const import UnitOfEnergy
+from homeassistant.core import callback
 from homeassistant.util import dt as dt_util
 from homeassistant.util.unit_conversion import EnergyConverter
 
-from .const import DOMAIN, LOGGER
+from .const import (
+    DOMAIN,
+    IMPORTER_STATE_RETENTION,
+    LOGGER,
+    STATISTICS_BATCH_SIZE,
+)
+from .models import local_day_hour_count
+from .tracing import span
 
 if TYPE_CHECKING:
-    from datetime import datetime
+    from collections.abc import Container
+    from datetime import date
 
     from homeassistant.components.recorder.models import StatisticData
     from homeassistant.core import HomeAssistant
 
+    from .models import EnergySegments
+
+SUM_TOLERANCE = 1e-6
+HOUR = timedelta(hours=1)
+
 
 class StuartEnergyImporter:
     """Handles formatting and submitting statistics for Stuart Energy."""
@@ -53,44 +67,198 @@ class StuartEnergyImporter:
         self.hass = hass
         self.site_info = site_info
         self.statistic_id = statistic_id
+        self._hour_states: dict[datetime, float] = {}
+        # Cumulative sums written by this importer, keyed by hour start. The
+        # recorder is only read when the hour before an import is unknown.
+        self._hour_sums: dict[datetime, float] = {}
+        self._latest_hour: datetime | None = None
+        # Polls and history imports write one sum chain, one at a time.
+        self._import_lock = asyncio.Lock()
+        self.rows_written = 0
+        self.sum_cache_hits = 0
+        self.sum_cache_misses = 0
+
+    @callback
+    def invalidate_sums(self) -> None:
+        """Forget the remembered sums and states, so both are read or rewritten."""
+        self._hour_sums.clear()
+        self._hour_states.clear()
+
+    @staticmethod
+    def aggregate_segments(
+        segments: EnergySegments,
+        hourly_data: dict[datetime, float] | None = None,
+    ) -> dict[datetime, float]:
+        """
+        Sum energy segments into hourly buckets.
 
-    async def import_segments(self, segments: list[dict[str, Any]]) -> datetime | None:
+        :param segments: Decoded energy segments
+        :param hourly_data: Optional buckets to add to, used for batch imports
+        :return: Energy generated per hour start
+        """
+        if hourly_data is None:
+            hourly_data = {}
+
+        hourly_totals: dict[int, float] = {}
+        for hour, total_kwh in segments:
+            hourly_totals[hour] = hourly_totals.get(hour, 0.0) + total_kwh
+
+        for hour, total_kwh in hourly_totals.items():
+            hour_start = dt_util.as_local(dt_util.utc_from_timestamp(hour))
+            hourly_data[hour_start] = hourly_data.get(hour_start, 0.0) + total_kwh
+
+        return hourly_data
+
+    async def import_segments(self, segments: EnergySegments) -> datetime | None:
         """Convert energy segments into hourly statistics and push to recorder."""
         if not segments:
             LOGGER.warning("No energy segments available to import.")
             return None
 
-        timezone = self.hass.config.time_zone
-        tzinfo = dt_util.get_time_zone(timezone)
+        return await self.import_hourly(self.aggregate_segments(segments))
 
-        hourly_data = defaultdict(float)
-        for entry in segments:
-            timestamp = dt_util.parse_datetime(entry["dateTimeLocal"])
-            if timestamp is None:
-                continue
-            if timestamp.tzinfo is None:
-                timestamp = timestamp.replace(tzinfo=tzinfo)
+    async def import_hourly(
+        self, hourly_data: dict[datetime, float]
+    ) -> datetime | None:
+        """
+        Push changed hourly totals to the recorder.
 
-            hour_start = timestamp.replace(minute=0, second=0, microsecond=0)
-            hourly_data[hour_start] += round(entry["energyGeneratedKwh"], 5)
+        Only hours whose energy differs from what this importer wrote before
+        are submitted, together with the later hours of the window whose
+        cumulative sum shifts as a result. The starting sum is looked up once
+        for the first changed hour and the running sum is carried forward in
+        memory. If the recorder already holds hours after the window, their
+        sums are corrected as well so the sum chain stays continuous. Imports
+        run one at a time, so a poll never writes sums a concurrent history
+        import is about to shift.
 
+        :param hourly_data: Energy generated per hour start
+        :return: Start of the last hour in ``hourly_data``
+        """
         if not hourly_data:
-            LOGGER.info("No valid hourly data aggregated from segments.")
             return None
 
-        first_hour = min(hourly_data)
-        cumulative_sum = await self._async_get_starting_sum(first_hour)
+        async with self._import_lock:
+            return await self._async_import_hourly(hourly_data)
+
+    async def _async_import_hourly(
+        self, hourly_data: dict[datetime, float]
+    ) -> datetime | None:
+        """Push changed hourly totals to the recorder, see ``import_hourly``."""
+        hours = sorted(hourly_data)
+        first_changed = next(
+            (
+                index
+                for index, hour_start in enumerate(hours)
+                if self._hour_states.get(hour_start)
+                != round(hourly_data[hour_start], 5)
+            ),
+            None,
+        )
+        if first_changed is None:
+            LOGGER.debug("No hourly statistics changed for %s", self.statistic_id)
+            return hours[-1]
 
+        # The sum shift for hours after the window, None if an old state is unknown.
+        sum_delta: float | None = 0.0
+        with span("starting_sum"):
+            cumulative_sum = await self._async_get_starting_sum(hours[first_changed])
         statistics_list: list[StatisticData] = []
-        for hour_start, total_kwh in sorted(hourly_data.items()):
+        for hour_start in hours[first_changed:]:
+            total_kwh = round(hourly_data[hour_start], 5)
+            previous_kwh = self._hour_states.get(hour_start)
+            if sum_delta is not None:
+                sum_delta = (
+                    None
+                    if previous_kwh is None
+                    else sum_delta + total_kwh - previous_kwh
+                )
             cumulative_sum += total_kwh
-            stat: StatisticData = {
-                "start": hour_start,
-                "state": total_kwh,
-                "sum": cumulative_sum,
+            statistics_list.append(
+                {"start": hour_start, "state": total_kwh, "sum": cumulative_sum}
+            )
+
+        self._async_add_statistics(statistics_list)
+        # Remembered only once submitted, so a failed import is written again.
+        for row in statistics_list:
+            self._hour_states[row["start"]] = row["state"]
+            self._hour_sums[row["start"]] = row["sum"]
+        LOGGER.debug(
+            "Imported %d of %d hourly statistics for site '%s' (%s)",
+            len(statistics_list),
+            len(hours),
+            self.site_info.get("name"),
+            self.statistic_id,
+        )
+
+        last_hour = hours[-1]
+        may_have_later = self._latest_hour is None or last_hour < self._latest_hour
+        if may_have_later and (sum_delta is None or abs(sum_delta) > SUM_TOLERANCE):
+            with span("repair_suffix"):
+                await self._async_repair_suffix(last_hour, cumulative_sum)
+        if self._latest_hour is None or last_hour > self._latest_hour:
+            self._latest_hour = last_hour
+
+        self._prune_hour_states()
+        return last_hour
+
+    async def _async_repair_suffix(self, last_hour: datetime, last_sum: float) -> None:
+        """
+        Shift the sums of recorded hours after ``last_hour`` onto ``last_sum``.
+
+        :param last_hour: Last hour written by the current import
+        :param last_sum: Cumulative sum written for ``last_hour``
+        """
+        # Rows queued by earlier imports must be in before their sums are read.
+        await self.async_wait_for_recorder()
+        later_stats = await get_instance(self.hass).async_add_executor_job(
+            statistics_during_period,
+            self.hass,
+            last_hour + timedelta(hours=1),
+            None,
+            {self.statistic_id},
+            "hour",
+            None,
+            {"state", "sum"},
+        )
+        rows = later_stats.get(self.statistic_id)
+        if not rows:
+            return
+
+        self._latest_hour = dt_util.as_local(
+            dt_util.utc_from_timestamp(rows[-1]["start"])
+        )
+        first_sum = rows[0].get("sum")
+        first_state = rows[0].get("state")
+        if not isinstance(first_sum, int | float):
+            return
+        delta = last_sum - (first_sum - (first_state or 0.0))
+        if abs(delta) <= SUM_TOLERANCE:
+            return
+
+        statistics_list: list[StatisticData] = [
+            {
+                "start": dt_util.utc_from_timestamp(row["start"]),
+                "state": row.get("state"),
+                "sum": (row.get("sum") or 0.0) + delta,
             }
-            statistics_list.append(stat)
+            for row in rows
+        ]
+        self._async_add_statistics(statistics_list)
+        self._hour_sums.update(
+            (row["start"], row["sum"])
+            for row in statistics_list
+            if row["start"] >= self._latest_hour - IMPORTER_STATE_RETENTION
+        )
+        LOGGER.debug(
+            "Shifted the sum of %d later hourly statistics by %.5f kWh (%s)",
+            len(statistics_list),
+            delta,
+            self.statistic_id,
+        )
 
+    def _async_add_statistics(self, statistics_list: list[StatisticData]) -> None:
+        """Submit statistics to the recorder in batches of STATISTICS_BATCH_SIZE."""
         metadata = StatisticMetaData(
             mean_type=StatisticMeanType.NONE,
             has_sum=True,
@@ -100,25 +268,184 @@ class StuartEnergyImporter:
             unit_class=EnergyConverter.UNIT_CLASS,
             unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
         )
+        self.rows_written += len(statistics_list)
+        with span("recorder_submit") as submit_span:
+            submit_span.set(rows=len(statistics_list))
+            for batch_start in range(0, len(statistics_list), STATISTICS_BATCH_SIZE):
+                async_add_external_statistics(
+                    self.hass,
+                    metadata,
+                    statistics_list[batch_start : batch_start + STATISTICS_BATCH_SIZE],
+                )
 
-        async_add_external_statistics(self.hass, metadata, statistics_list)
-        LOGGER.debug(
-            "Imported %d hourly statistics for site '%s' (%s)",
-            len(statistics_list),
-            self.site_info.get("name"),
-            self.statistic_id,
+    def _prune_hour_states(self) -> None:
+        """Forget imported states that are too old to be revised by a poll."""
+        if self._latest_hour is None:
+            return
+        cutoff = self._latest_hour - IMPORTER_STATE_RETENTION
+        self._hour_states = {
+            hour_start: total_kwh
+            for hour_start, total_kwh in self._hour_states.items()
+            if hour_start >= cutoff
+        }
+        self._hour_sums = {
+            hour_start: hour_sum
+            for hour_start, hour_sum in self._hour_sums.items()
+            if hour_start >= cutoff
+        }
+
+    async def async_get_first_recorded_day(
+        self, start_time: datetime, end_time: datetime
+    ) -> date | None:
+        """
+        Return the first day with statistics between two times.
+
+        :param start_time: Start of the range to look at
+        :param end_time: End of the range to look at
+        :return: First local day holding a statistic, None if there is none
+        """
+        daily_stats = await get_instance(self.hass).async_add_executor_job(
+            statistics_during_period,
+            self.hass,
+            start_time,
+            end_time,
+            {self.statistic_id},
+            "day",
+            None,
+            {"sum"},
+        )
+        if not (rows := daily_stats.get(self.statistic_id)):
+            return None
+        return dt_util.as_local(dt_util.utc_from_timestamp(rows[0]["start"])).date()
+
+    async def async_find_gap_days(
+        self,
+        first_day: date,
+        last_day: date,
+        fetched_days: Container[date] = (),
+    ) -> list[date]:
+        """
+        Return the days with missing or zero-filled hourly statistics.
+
+        The hourly statistics of the whole range are read in one query. A day
+        is a gap if it has fewer rows than the hours its segments are bucketed
+        in, unless its only row starts at midnight, which is how daily totals
+        are stored. A complete day without any energy is a gap as well, unless
+        it is in ``fetched_days``, as it then really produced nothing.
+
+        :param first_day: First local day to check
+        :param last_day: Last local day to check
+        :param fetched_days: Days known to have been fetched from Stuart
+        :return: Days to fetch again, in order
+        """
+        time_zone = dt_util.get_default_time_zone()
+        start_time = datetime.combine(first_day, time.min, tzinfo=time_zone)
+        end_time = datetime.combine(
+            last_day + timedelta(days=1), time.min, tzinfo=time_zone
+        )
+        hourly_stats = await get_instance(self.hass).async_add_executor_job(
+            statistics_during_period,
+            self.hass,
+            start_time,
+            end_time,
+            {self.statistic_id},
+            "hour",
+            None,
+            {"state"},
         )
 
-        return statistics_list[-1]["start"] if statistics_list else None
+        # Rows, energy and whether the first row starts at midnight, per day.
+        recorded: dict[date, tuple[int, float, bool]] = {}
+        for row in hourly_stats.get(self.statistic_id, ()):
+            hour_start = dt_util.as_local(dt_util.utc_from_timestamp(row["start"]))
+            rows, energy, at_midnight = recorded.get(
+                hour_start.date(), (0, 0.0, hour_start.hour == 0)
+            )
+            recorded[hour_start.date()] = (
+                rows + 1,
+                energy + (row.get("state") or 0.0),
+                at_midnight,
+            )
+
+        gap_days: list[date] = []
+        day = first_day
+        while day <= last_day:
+            rows, energy, at_midnight = recorded.get(day, (0, 0.0, False))
+            daily_total = rows == 1 and at_midnight
+            if not daily_total and (
+                rows < local_day_hour_count(day, time_zone)
+                or (energy <= SUM_TOLERANCE and day not in fetched_days)
+            ):
+                gap_days.append(day)
+            day += timedelta(days=1)
+        return gap_days
+
+    async def async_wait_for_recorder(self) -> None:
+        """Wait until the recorder has written the submitted statistics."""
+        await get_instance(self.hass).async_block_till_done()
 
     async def _async_get_starting_sum(self, start_time: datetime) -> float:
-        """Get the last recorder sum before the import window starts."""
-        window_start = start_time - timedelta(hours=1)
+        """
+        Get the cumulative sum before the import window starts.
+
+        If this importer remembers the sum it wrote for the preceding hour,
+        only that hour is read back once the pending writes are in, instead
+        of searching for the last sum. A different sum means the statistic
+        was changed outside of the integration, e.g. adjusted or cleared from
+        the statistics developer tools, which fire no event. All remembered
+        sums and states are then dropped and the recorded sum is used.
+        """
+        previous_hour = dt_util.as_utc(start_time) - HOUR
+        if (cached_sum := self._hour_sums.get(previous_hour)) is None:
+            self.sum_cache_misses += 1
+            return await self._async_read_starting_sum(start_time)
+
+        await self.async_wait_for_recorder()
+        recorded_sum = await self._async_read_hour_sum(previous_hour)
+        if recorded_sum is not None and abs(cached_sum - recorded_sum) <= SUM_TOLERANCE:
+            self.sum_cache_hits += 1
+            return cached_sum
+
+        self.sum_cache_misses += 1
+        LOGGER.info(
+            "Statistic %s was changed outside of the integration, re-reading its sums",
+            self.statistic_id,
+        )
+        self.invalidate_sums()
+        if recorded_sum is not None:
+            return recorded_sum
+        return await self._async_read_starting_sum(start_time)
+
+    async def _async_read_hour_sum(self, hour_start: datetime) -> float | None:
+        """Read the recorder sum of one hour, None if the hour has no sum."""
+        hour_stats = await get_instance(self.hass).async_add_executor_job(
+            statistics_during_period,
+            self.hass,
+            hour_start,
+            hour_start + HOUR,
+            {self.statistic_id},
+            "hour",
+            None,
+            {"sum"},
+        )
+        if rows := hour_stats.get(self.statistic_id):
+            statistic_sum = rows[0].get("sum")
+            if isinstance(statistic_sum, int | float):
+                return float(statistic_sum)
+        return None
+
+    async def _async_read_starting_sum(self, start_time: datetime) -> float:
+        """
+        Read the last recorder sum before the import window starts.
+
+        The day before the window is searched, so the sum is also found when
+        it is held by a daily total or the window follows a gap.
+        """
         current_stats = await get_instance(self.hass).async_add_executor_job(
             statistics_during_period,
             self.hass,
-            window_start,
-            window_start + timedelta(seconds=1),
+            start_time - timedelta(days=1),
+            start_time,
             {self.statistic_id},
             "hour",
             None,
@@ -126,7 +453,7 @@ class StuartEnergyImporter:
         )
 
         if current_stat_rows := current_stats.get(self.statistic_id):
-            statistic_sum = current_stat_rows[0].get("sum")
+            statistic_sum = current_stat_rows[-1].get("sum")
             if isinstance(statistic_sum, int | float):
                 return float(statistic_sum)
 
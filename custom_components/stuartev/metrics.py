@@ -0,0 +1,108 @@
+"""
+Request metrics for Stuart Energy integration.
+
+Counters and latency histograms kept in memory since the entry was set up,
+exposed through the diagnostic sensors and the diagnostics download.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Any
+
+from .const import METRICS_LATENCY_BUCKETS
+
+
+@dataclass(slots=True)
+class LatencyHistogram:
+    """Histogram of durations over METRICS_LATENCY_BUCKETS."""
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    last: float | None = None
+    # One count per bucket upper bound, plus one for longer durations.
+    buckets: list[int] = field(
+        default_factory=lambda: [0] * (len(METRICS_LATENCY_BUCKETS) + 1)
+    )
+
+    def observe(self, seconds: float) -> None:
+        """Record one duration in seconds."""
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+        self.buckets[bisect_left(METRICS_LATENCY_BUCKETS, seconds)] += 1
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean duration in seconds, None without observations."""
+        return self.total / self.count if self.count else None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the histogram for diagnostics."""
+        return {
+            "count": self.count,
+            "mean_s": round(self.mean, 4) if self.count else None,
+            "max_s": round(self.max, 4),
+            "last_s": round(self.last, 4) if self.last is not None else None,
+            "buckets": {
+                f"le_{bound}": count
+                for bound, count in zip(
+                    (*METRICS_LATENCY_BUCKETS, "inf"), self.buckets, strict=True
+                )
+            },
+        }
+
+
+@dataclass(slots=True)
+class EndpointMetrics:
+    """Counters of one API endpoint."""
+
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    throttled: int = 0
+    bytes_received: int = 0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters for diagnostics."""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "bytes_received": self.bytes_received,
+            "latency": self.latency.as_dict(),
+        }
+
+
+class StuartMetrics:
+    """Per-endpoint request metrics of an API client or of the authentication."""
+
+    def __init__(self) -> None:
+        """Initialize empty metrics."""
+        self.endpoints: dict[str, EndpointMetrics] = {}
+
+    def endpoint(self, name: str) -> EndpointMetrics:
+        """Return the metrics of an endpoint, creating them on first use."""
+        if (metrics := self.endpoints.get(name)) is None:
+            metrics = self.endpoints[name] = EndpointMetrics()
+        return metrics
+
+    def total(self, counter: str) -> int:
+        """Return a counter summed over all endpoints."""
+        return sum(getattr(metrics, counter) for metrics in self.endpoints.values())
+
+    def mean_latency(self) -> float | None:
+        """Return the mean request latency over all endpoints in seconds."""
+        count = sum(metrics.latency.count for metrics in self.endpoints.values())
+        if not count:
+            return None
+        return sum(m.latency.total for m in self.endpoints.values()) / count
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics of every endpoint for diagnostics."""
+        return {name: metrics.as_dict() for name, metrics in self.endpoints.items()}
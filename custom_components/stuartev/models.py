@@ -0,0 +1,267 @@
+"""
+Data models for Stuart Energy integration.
+
+Solar-stats responses are decoded once into compact parallel arrays, which the
+coordinator, backfill and importer work on instead of lists of JSON dicts.
+The values shown by the energy sensors are derived from the hourly data once
+per poll.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.util import dt as dt_util
+
+from .const import DERIVED_ROLLING_DAYS
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from datetime import date, tzinfo
+
+HOUR_SECONDS = 3600
+# Length of the ``YYYY-MM-DDTHH:MM:SS`` timestamps sent by Stuart.
+LOCAL_TIME_LENGTH = 19
+# Length of the ``YYYY-MM-DD`` dates that daily totals may be labelled with.
+LOCAL_DATE_LENGTH = 10
+
+
+@dataclass(slots=True)
+class EnergySegments:
+    """
+    Energy segments as parallel arrays.
+
+    ``hours`` holds the epoch of the local hour each segment starts in and
+    ``kwh`` the energy generated in the segment.
+    """
+
+    hours: array[int] = field(default_factory=lambda: array("q"))
+    kwh: array[float] = field(default_factory=lambda: array("d"))
+
+    def __len__(self) -> int:
+        """Return the number of segments."""
+        return len(self.kwh)
+
+    def __iter__(self) -> Iterator[tuple[int, float]]:
+        """Iterate over ``(hour epoch, kWh)`` pairs."""
+        return zip(self.hours, self.kwh, strict=True)
+
+    def append(self, hour: int, kwh: float) -> None:
+        """Append one segment."""
+        self.hours.append(hour)
+        self.kwh.append(kwh)
+
+    def extend(self, other: EnergySegments) -> None:
+        """Append all segments of another instance."""
+        self.hours.extend(other.hours)
+        self.kwh.extend(other.kwh)
+
+    @property
+    def total_kwh(self) -> float:
+        """Return the energy of all segments."""
+        return sum(self.kwh)
+
+
+@dataclass(slots=True)
+class SolarStats:
+    """Decoded solar-stats response."""
+
+    total_kwh: float | None
+    co2_kg: float | None
+    segments: EnergySegments
+    # Digest of the raw segments per ``YYYY-MM-DDTHH`` local hour key.
+    digests: dict[str, bytes]
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any] | None, time_zone: tzinfo) -> SolarStats:
+        """
+        Decode a solar-stats response.
+
+        Segments are bucketed into local hours and digested in the same pass.
+        Segments without a parsable timestamp are skipped.
+
+        :param data: JSON response of the solar-stats endpoint
+        :param time_zone: Time zone of the naive local timestamps
+        :return: Decoded response
+        """
+        data = data or {}
+        segments = EnergySegments()
+        hashers: dict[str, Any] = {}
+        for segment in data.get("energyGeneratedSegments") or ():
+            local_time = str(segment.get("dateTimeLocal", ""))
+            energy = round(float(segment.get("energyGeneratedKwh", 0.0)), 5)
+
+            hour_key = local_time[:13]
+            if (hasher := hashers.get(hour_key)) is None:
+                hasher = hashers[hour_key] = hashlib.blake2b(digest_size=8)
+            hasher.update(f"{local_time}={energy:.5f};".encode())
+
+            hour = local_hour_epoch(local_time, time_zone)
+            if hour is None:
+                continue
+            segments.append(hour, energy)
+
+        return cls(
+            total_kwh=_optional_float(data.get("totalGeneratedKwh")),
+            co2_kg=_optional_float(data.get("co2ReducedKg")),
+            segments=segments,
+            digests={key: hasher.digest() for key, hasher in hashers.items()},
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class DerivedEnergy:
+    """Values derived from the hourly energy of the last poll."""
+
+    today_kwh: float
+    yesterday_kwh: float
+    last_hour_start: datetime | None
+    last_hour_kwh: float | None
+    peak_hour_start: datetime | None
+    peak_hour_kwh: float | None
+    rolling_kwh: float | None
+
+    @property
+    def last_hour_power_w(self) -> float | None:
+        """Return the average power of the last complete hour in watts."""
+        return self.last_hour_kwh * 1000 if self.last_hour_kwh is not None else None
+
+    @classmethod
+    def from_hourly(
+        cls,
+        hourly_data: dict[datetime, float],
+        now: datetime,
+        day_totals: dict[date, float],
+        *,
+        sun_down: bool = False,
+    ) -> DerivedEnergy:
+        """
+        Derive the sensor values in one pass over the hourly data.
+
+        :param hourly_data: Energy generated per local hour start, covering
+            at least yesterday and today
+        :param now: Current local time
+        :param day_totals: Energy of the earlier days of the rolling period
+            that are not in ``hourly_data``, the rolling total is None unless
+            all of them are known
+        :param sun_down: Whether the sun was down during the hour that just
+            ended, which then produced nothing even if it was not fetched
+        :return: Derived values
+        """
+        today = now.date()
+        first_day = today - timedelta(days=DERIVED_ROLLING_DAYS - 1)
+        totals: dict[date, float] = {}
+        last_hour: datetime | None = None
+        peak_hour: datetime | None = None
+        complete_before = now.timestamp() - HOUR_SECONDS
+        for hour_start, total_kwh in hourly_data.items():
+            day = hour_start.date()
+            if day >= first_day:
+                totals[day] = totals.get(day, 0.0) + total_kwh
+            if day == today and (
+                peak_hour is None or total_kwh > hourly_data[peak_hour]
+            ):
+                peak_hour = hour_start
+            if hour_start.timestamp() <= complete_before and (
+                last_hour is None or hour_start > last_hour
+            ):
+                last_hour = hour_start
+        last_hour_kwh = hourly_data[last_hour] if last_hour else None
+
+        ended_hour = dt_util.as_local(
+            dt_util.as_utc(now.replace(minute=0, second=0, microsecond=0))
+            - timedelta(hours=1)
+        )
+        if sun_down and (last_hour is None or last_hour < ended_hour):
+            last_hour, last_hour_kwh = ended_hour, 0.0
+
+        yesterday = today - timedelta(days=1)
+        earlier_days = [
+            today - timedelta(days=days_ago)
+            for days_ago in range(2, DERIVED_ROLLING_DAYS)
+        ]
+        earlier = [totals.get(day, day_totals.get(day)) for day in earlier_days]
+        return cls(
+            today_kwh=totals.get(today, 0.0),
+            yesterday_kwh=totals.get(yesterday, 0.0),
+            last_hour_start=last_hour,
+            last_hour_kwh=last_hour_kwh,
+            peak_hour_start=peak_hour,
+            peak_hour_kwh=hourly_data[peak_hour] if peak_hour else None,
+            rolling_kwh=(
+                None
+                if None in earlier
+                else totals.get(today, 0.0)
+                + totals.get(yesterday, 0.0)
+                + sum(total for total in earlier if total is not None)
+            ),
+        )
+
+
+def local_hour_epoch(local_time: str, time_zone: tzinfo) -> int | None:
+    """
+    Return the epoch of the local hour a timestamp falls in.
+
+    Timestamps in the fixed Stuart format are resolved by slicing the string
+    and looking up the hour in a per-day table, other formats are parsed.
+
+    :param local_time: Timestamp, naive timestamps are local to ``time_zone``
+    :param time_zone: Time zone of naive timestamps
+    :return: Epoch of the hour start, None if the timestamp is invalid
+    """
+    if len(local_time) == LOCAL_DATE_LENGTH:
+        local_time += "T00:00:00"
+    if len(local_time) == LOCAL_TIME_LENGTH and local_time[10] == "T":
+        try:
+            hour = int(local_time[11:13])
+            day_hours = _local_day_hours(local_time[:10], time_zone)
+        except ValueError:
+            return None
+        return day_hours[hour] if 0 <= hour < len(day_hours) else None
+
+    timestamp = dt_util.parse_datetime(local_time)
+    if timestamp is None:
+        return None
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=time_zone)
+    return int(timestamp.replace(minute=0, second=0, microsecond=0).timestamp())
+
+
+def local_day_hour_count(day: date, time_zone: tzinfo) -> int:
+    """
+    Return the number of distinct hours segments of a local day are bucketed in.
+
+    Hours repeated on a DST fall-back day share one epoch and the hour skipped
+    in spring maps onto the next one, the same as in ``local_hour_epoch``.
+
+    :param day: Local calendar day
+    :param time_zone: Time zone of the day
+    :return: Number of hourly statistics a complete day has
+    """
+    return len(set(_local_day_hours(day.isoformat(), time_zone)))
+
+
+@lru_cache(maxsize=512)
+def _local_day_hours(day: str, time_zone: tzinfo) -> tuple[int, ...]:
+    """
+    Return the epoch of each local hour of a day.
+
+    The offset is resolved per hour, so days with a DST transition map their
+    skipped and repeated hours the same way as attaching the time zone does.
+
+    :param day: Local calendar day as ``YYYY-MM-DD``
+    :param time_zone: Time zone of the day
+    :return: Epochs of the hours 0 to 23
+    """
+    midnight = datetime.fromisoformat(day).replace(tzinfo=time_zone)
+    return tuple(int(midnight.replace(hour=hour).timestamp()) for hour in range(24))
+
+
+def _optional_float(value: Any) -> float | None:
+    """Return the value as float, None if it is not a number."""
+    return float(value) if isinstance(value, int | float) else None
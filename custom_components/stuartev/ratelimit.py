@@ -0,0 +1,75 @@
+"""
+Rate limiting for Stuart Energy integration.
+
+Provides the token bucket shared by every request sent to one API host.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING
+
+from .const import API_RATE_BURST, API_RATE_LIMIT, DOMAIN
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+RATE_LIMITER_KEY = f"{DOMAIN}_rate_limiter"
+
+
+class StuartRateLimiter:
+    """Token bucket with a global pause used to honor Retry-After."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        """
+        Initialize the limiter.
+
+        :param rate: Requests allowed per second on average
+        :param burst: Requests allowed back to back after an idle period
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def async_acquire(self) -> None:
+        """Wait until a request may be sent."""
+        # Waiters queue on the lock, so requests are released in FIFO order.
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold back every caller for the given time.
+
+        :param seconds: Delay requested by the API, e.g. from Retry-After
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def async_get_rate_limiter(hass: HomeAssistant, host: str) -> StuartRateLimiter:
+    """
+    Return the limiter shared by all config entries using an API host.
+
+    :param hass: Home Assistant instance
+    :param host: Host the requests are sent to, e.g. the simulator's
+    """
+    limiters: dict[str, StuartRateLimiter] = hass.data.setdefault(RATE_LIMITER_KEY, {})
+    if (limiter := limiters.get(host)) is None:
+        limiter = limiters[host] = StuartRateLimiter(API_RATE_LIMIT, API_RATE_BURST)
+    return limiter
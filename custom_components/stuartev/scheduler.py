@@ -0,0 +1,131 @@
+"""
+Poll scheduler for Stuart Energy integration.
+
+Times polls just after Stuart publishes a new hour and skips the night, when
+a solar site produces nothing. The publication lag is learned from whether
+the hour that just ended was already available at the poll.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.const import SUN_EVENT_SUNRISE, SUN_EVENT_SUNSET
+from homeassistant.helpers.sun import get_astral_event_next
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    LOGGER,
+    PUBLICATION_LAG_DEFAULT,
+    PUBLICATION_LAG_MAX,
+    PUBLICATION_LAG_MIN,
+    PUBLICATION_LAG_STEP,
+)
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+HOUR = timedelta(hours=1)
+
+
+def _hour_start(moment: datetime) -> datetime:
+    """Return the start of the local hour containing ``moment``."""
+    return dt_util.as_local(moment).replace(minute=0, second=0, microsecond=0)
+
+
+def sun_was_down(hass: HomeAssistant, now: datetime) -> bool:
+    """Return True if the sun was down an hour before ``now``."""
+    sunrise = get_astral_event_next(hass, SUN_EVENT_SUNRISE, now - HOUR)
+    sunset = get_astral_event_next(hass, SUN_EVENT_SUNSET, now - HOUR)
+    return sunset > sunrise
+
+
+class StuartPollScheduler:
+    """Plan the next poll of a site from the sun and the publication lag."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        scan_interval: timedelta,
+        stagger: timedelta = timedelta(0),
+    ) -> None:
+        """
+        Initialize the scheduler.
+
+        :param hass: Home Assistant instance, its location is used for the sun
+        :param scan_interval: Minimum time between daytime polls
+        :param stagger: Delay of the site's polls after the publication lag,
+            so the sites of an entry do not all poll at once
+        """
+        self.hass = hass
+        self.scan_interval = scan_interval
+        self.stagger = stagger
+        self.publication_lag = PUBLICATION_LAG_DEFAULT
+        self.next_poll: datetime | None = None
+
+    def _next_sun_events(self, now: datetime) -> tuple[datetime, datetime]:
+        """Return the next sunrise and sunset after ``now``."""
+        return (
+            get_astral_event_next(self.hass, SUN_EVENT_SUNRISE, now),
+            get_astral_event_next(self.hass, SUN_EVENT_SUNSET, now),
+        )
+
+    def observe(self, now: datetime, latest_hour: datetime | None) -> None:
+        """
+        Adjust the publication lag after a daytime poll.
+
+        If the hour that ended before the poll was already published, the lag
+        is shortened by one step, otherwise it is lengthened by two, so polls
+        converge on the earliest time new hours are reliably available.
+
+        :param now: Time of the poll
+        :param latest_hour: Start of the newest hour in the fetched data
+        """
+        if sun_was_down(self.hass, now):
+            # The sun was down during the last hour, so it may have no data.
+            return
+        expected_hour = _hour_start(now) - HOUR
+        if latest_hour is not None and latest_hour >= expected_hour:
+            lag = self.publication_lag - PUBLICATION_LAG_STEP
+        else:
+            lag = self.publication_lag + 2 * PUBLICATION_LAG_STEP
+        lag = min(PUBLICATION_LAG_MAX, max(PUBLICATION_LAG_MIN, lag))
+        if lag != self.publication_lag:
+            LOGGER.debug("Stuart publication lag estimate is now %s", lag)
+        self.publication_lag = lag
+
+    def next_poll_delay(self, now: datetime) -> timedelta:
+        """
+        Return the delay until the next poll.
+
+        Daytime polls land ``publication_lag`` plus the site's stagger after
+        an hour ends, at the first such time at least ``scan_interval`` after
+        ``now``. Only the poll fetching the hour the sun sets in may come
+        earlier, then polling pauses until the first hour after sunrise has
+        been published.
+
+        :param now: Current time
+        :return: Delay to use as the coordinator's update interval
+        """
+        offset = self.publication_lag + self.stagger
+        earliest = now + self.scan_interval
+        next_poll = _hour_start(earliest - offset) + offset
+        if next_poll < earliest:
+            next_poll += HOUR
+
+        sunrise, sunset = self._next_sun_events(now)
+        if sunset < sunrise:
+            next_poll = min(next_poll, _hour_start(sunset) + HOUR + offset)
+        else:
+            next_poll = max(next_poll, _hour_start(sunrise) + HOUR + offset)
+
+        self.next_poll = next_poll
+        return max(next_poll - now, timedelta(minutes=1))
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the scheduler state for diagnostics."""
+        return {
+            "publication_lag_s": self.publication_lag.total_seconds(),
+            "next_poll": self.next_poll,
+        }
@@ -2,28 +2,190 @@
 Sensor entities for Stuart Energy integration.
 
 This module defines sensor entities for displaying energy data and CO2 reduction
-from the Stuart Energy API in Home Assistant.
+from the Stuart Energy API in Home Assistant. The energy sensors read values
+the coordinator derives once per poll, so they add no requests or work on
+state reads.
 """
 
-from typing import TYPE_CHECKING
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
 
 from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
 )
-from homeassistant.helpers.update_coordinator import (
-    CoordinatorEntity,
-    DataUpdateCoordinator,
+from homeassistant.const import (
+    EntityCategory,
+    UnitOfEnergy,
+    UnitOfInformation,
+    UnitOfPower,
+    UnitOfTime,
 )
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import DOMAIN
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+    from datetime import datetime
+
     from homeassistant.config_entries import ConfigEntry
     from homeassistant.core import HomeAssistant
     from homeassistant.helpers.entity_platform import AddEntitiesCallback
     from homeassistant.helpers.typing import StateType
 
+    from .coordinator import StuartEnergyCoordinator
+    from .models import DerivedEnergy
+
+
+@dataclass(frozen=True, kw_only=True)
+class StuartMetricSensorEntityDescription(SensorEntityDescription):
+    """Description of a diagnostic sensor reading the request metrics."""
+
+    value_fn: Callable[[StuartEnergyCoordinator], StateType]
+
+
+def _milliseconds(seconds: float | None) -> float | None:
+    """Convert a duration in seconds to rounded milliseconds."""
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+METRIC_SENSORS: tuple[StuartMetricSensorEntityDescription, ...] = (
+    StuartMetricSensorEntityDescription(
+        key="api_requests",
+        name="API requests",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: coordinator.api.metrics.total("requests"),
+    ),
+    StuartMetricSensorEntityDescription(
+        key="api_errors",
+        name="API errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: coordinator.api.metrics.total("errors"),
+    ),
+    StuartMetricSensorEntityDescription(
+        key="api_retries",
+        name="API retries",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: coordinator.api.metrics.total("retries"),
+    ),
+    StuartMetricSensorEntityDescription(
+        key="api_throttled",
+        name="API rate limited responses",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: coordinator.api.metrics.total("throttled"),
+    ),
+    StuartMetricSensorEntityDescription(
+        key="api_bytes_received",
+        name="API data received",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: coordinator.api.metrics.total("bytes_received"),
+    ),
+    StuartMetricSensorEntityDescription(
+        key="api_latency",
+        name="API mean latency",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator: _milliseconds(
+            coordinator.api.metrics.mean_latency()
+        ),
+    ),
+    StuartMetricSensorEntityDescription(
+        key="auth_requests",
+        name="Authentication requests",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: coordinator.api.auth.metrics.total("requests"),
+    ),
+    StuartMetricSensorEntityDescription(
+        key="update_duration",
+        name="Last update duration",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator: _milliseconds(coordinator.update_duration.last),
+    ),
+    StuartMetricSensorEntityDescription(
+        key="statistics_rows",
+        name="Statistics rows imported",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: (
+            coordinator.importer.rows_written if coordinator.importer else None
+        ),
+    ),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class StuartDerivedSensorEntityDescription(SensorEntityDescription):
+    """Description of a sensor reading a value derived from the last poll."""
+
+    value_fn: Callable[[DerivedEnergy], StateType]
+    hour_fn: Callable[[DerivedEnergy], datetime | None] | None = None
+
+
+def _kwh(value: float | None) -> float | None:
+    """Round an energy value in kWh."""
+    return round(value, 3) if value is not None else None
+
+
+DERIVED_SENSORS: tuple[StuartDerivedSensorEntityDescription, ...] = (
+    StuartDerivedSensorEntityDescription(
+        key="energy_today",
+        name="Energy Today",
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        value_fn=lambda derived: _kwh(derived.today_kwh),
+    ),
+    StuartDerivedSensorEntityDescription(
+        key="energy_yesterday",
+        name="Energy Yesterday",
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        value_fn=lambda derived: _kwh(derived.yesterday_kwh),
+    ),
+    StuartDerivedSensorEntityDescription(
+        key="energy_last_hour",
+        name="Energy Last Hour",
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        value_fn=lambda derived: _kwh(derived.last_hour_kwh),
+        hour_fn=lambda derived: derived.last_hour_start,
+    ),
+    StuartDerivedSensorEntityDescription(
+        key="peak_hour_energy_today",
+        name="Peak Hour Energy Today",
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        value_fn=lambda derived: _kwh(derived.peak_hour_kwh),
+        hour_fn=lambda derived: derived.peak_hour_start,
+    ),
+    StuartDerivedSensorEntityDescription(
+        key="energy_last_7_days",
+        name="Energy Last 7 Days",
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        value_fn=lambda derived: _kwh(derived.rolling_kwh),
+    ),
+    StuartDerivedSensorEntityDescription(
+        key="average_power_last_hour",
+        name="Average Power Last Hour",
+        device_class=SensorDeviceClass.POWER,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda derived: (
+            round(power, 1)
+            if (power := derived.last_hour_power_w) is not None
+            else None
+        ),
+        hour_fn=lambda derived: derived.last_hour_start,
+    ),
+)
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -37,25 +199,35 @@ async def async_setup_entry(
     :param entry: Config entry with user data
     :param async_add_entities: Function to add entities to Home Assistant
     """
-    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
-    sensors = [
-        StuartEnergySensor(coordinator),
-        StuartCO2ReducedSensor(coordinator),
-    ]
+    coordinators = hass.data[DOMAIN][entry.entry_id]["coordinators"]
+    sensors = []
+    for coordinator in coordinators.values():
+        sensors.append(StuartEnergySensor(coordinator))
+        sensors.append(StuartCO2ReducedSensor(coordinator))
+        sensors.extend(
+            StuartDerivedSensor(coordinator, description)
+            for description in DERIVED_SENSORS
+        )
+        sensors.extend(
+            StuartMetricSensor(coordinator, description)
+            for description in METRIC_SENSORS
+        )
     async_add_entities(sensors)
 
 
 class StuartEnergySensor(CoordinatorEntity, SensorEntity):
     """Sensor for displaying energy generated by Stuart Energy."""
 
-    def __init__(self, coordinator: DataUpdateCoordinator) -> None:
+    _unrecorded_attributes = frozenset({"last_success"})
+
+    def __init__(self, coordinator: StuartEnergyCoordinator) -> None:
         """
         Initialize the StuartEnergySensor.
 
         :param coordinator: Data update coordinator
         """
         super().__init__(coordinator)
-        self._attr_unique_id = "stuart_energy_generated"
+        self._attr_unique_id = f"{coordinator.api.site_id}_energy_generated"
         self._attr_native_unit_of_measurement = "kWh"
         self._attr_device_class = SensorDeviceClass.ENERGY
 
@@ -75,18 +247,28 @@ class StuartEnergySensor(CoordinatorEntity, SensorEntity):
         """Return the current value of the sensor."""
         return round(self.coordinator.data.get("total", 0.0), 3)
 
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return when the value was last fetched and since when it is stale."""
+        return {
+            "last_success": self.coordinator.data.get("last_success"),
+            "stale_since": self.coordinator.data.get("stale_since"),
+        }
+
 
 class StuartCO2ReducedSensor(CoordinatorEntity, SensorEntity):
     """Sensor for CO2 reduction (kg of CO2 avoided) by Stuart Energy."""
 
-    def __init__(self, coordinator: DataUpdateCoordinator) -> None:
+    _unrecorded_attributes = frozenset({"last_success"})
+
+    def __init__(self, coordinator: StuartEnergyCoordinator) -> None:
         """
         Initialize the StuartCO2ReducedSensor.
 
         :param coordinator: Data update coordinator
         """
         super().__init__(coordinator)
-        self._attr_unique_id = "stuart_co2_reduced"
+        self._attr_unique_id = f"{coordinator.api.site_id}_co2_reduced"
         self._attr_native_unit_of_measurement = "kg"
 
     @property
@@ -108,3 +290,91 @@ class StuartCO2ReducedSensor(CoordinatorEntity, SensorEntity):
         :return: Current value of CO2 reduction
         """
         return round(self.coordinator.data.get("co2", 0.0), 3)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return when the value was last fetched and since when it is stale."""
+        return {
+            "last_success": self.coordinator.data.get("last_success"),
+            "stale_since": self.coordinator.data.get("stale_since"),
+        }
+
+
+class StuartMetricSensor(CoordinatorEntity, SensorEntity):
+    """Diagnostic sensor exposing one request metric, disabled by default."""
+
+    entity_description: StuartMetricSensorEntityDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self,
+        coordinator: StuartEnergyCoordinator,
+        description: StuartMetricSensorEntityDescription,
+    ) -> None:
+        """
+        Initialize the metric sensor.
+
+        :param coordinator: Data update coordinator of the site
+        :param description: Metric to expose
+        """
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_unique_id = f"{coordinator.api.site_id}_{description.key}"
+
+    @property
+    def name(self) -> str:
+        """Return the name of the sensor."""
+        site = self.coordinator.data.get("site")
+        site_name = site.get("name") if site else "Stuart Site"
+        return f"{site_name} {self.entity_description.name}"
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the current value of the metric."""
+        return self.entity_description.value_fn(self.coordinator)
+
+
+class StuartDerivedSensor(CoordinatorEntity, SensorEntity):
+    """Sensor exposing one value derived from the hourly data of the last poll."""
+
+    entity_description: StuartDerivedSensorEntityDescription
+    _unrecorded_attributes = frozenset({"hour_start"})
+
+    def __init__(
+        self,
+        coordinator: StuartEnergyCoordinator,
+        description: StuartDerivedSensorEntityDescription,
+    ) -> None:
+        """
+        Initialize the derived sensor.
+
+        :param coordinator: Data update coordinator of the site
+        :param description: Derived value to expose
+        """
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_unique_id = f"{coordinator.api.site_id}_{description.key}"
+
+    @property
+    def name(self) -> str:
+        """Return the name of the sensor."""
+        site = self.coordinator.data.get("site")
+        site_name = site.get("name") if site else "Stuart Site"
+        return f"{site_name} {self.entity_description.name}"
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the value derived at the last poll."""
+        if (derived := self.coordinator.data.get("derived")) is None:
+            return None
+        return self.entity_description.value_fn(derived)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the start of the hour the value belongs to, if any."""
+        if self.entity_description.hour_fn is None or (
+            (derived := self.coordinator.data.get("derived")) is None
+        ):
+            return None
+        return {"hour_start": self.entity_description.hour_fn(derived)}
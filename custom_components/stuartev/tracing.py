@@ -0,0 +1,184 @@
+"""
+Tracing for Stuart Energy integration.
+
+Times the stages of polls and history imports as spans and keeps the last
+traces of each entry in a ring buffer. Spans are attached to the trace of
+the running task through a context variable, so the code being traced does
+not need a reference to the tracer. With tracing off no trace is started
+and every span is a shared no-op object.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from contextvars import ContextVar, Token
+from typing import Any, Self
+
+from homeassistant.util import dt as dt_util
+
+from .const import TRACE_BUFFER_SIZE, TRACE_MAX_SPANS
+
+
+class _NullSpan:
+    """Span doing nothing, used whenever no trace is being recorded."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_exc_info: object) -> None:
+        return None
+
+    def set(self, **_attributes: Any) -> None:
+        """Ignore span attributes."""
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """Timed stage of a trace."""
+
+    __slots__ = ("_token", "attributes", "depth", "name", "start", "trace")
+
+    def __init__(self, trace: Trace, name: str, depth: int) -> None:
+        """
+        Initialize the span.
+
+        :param trace: Trace the span belongs to
+        :param name: Stage name
+        :param depth: Nesting level below the trace root
+        """
+        self.trace = trace
+        self.name = name
+        self.depth = depth
+        self.attributes: dict[str, Any] = {}
+        self.start = 0.0
+        self._token: Token[Span | None] | None = None
+
+    def __enter__(self) -> Self:
+        """Start timing the span and make it the parent of new spans."""
+        self.start = time.perf_counter()
+        self._token = _CURRENT_SPAN.set(self)
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, *_: object) -> None:
+        """Stop timing the span and record it in its trace."""
+        end = time.perf_counter()
+        if self._token is not None:
+            _CURRENT_SPAN.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.trace.add_span(self, end)
+
+    def set(self, **attributes: Any) -> None:
+        """Attach attributes to the span."""
+        self.attributes.update(attributes)
+
+
+class Trace(Span):
+    """Root span of one poll or history import, holding the spans below it."""
+
+    __slots__ = ("_tracer", "dropped", "ended", "spans", "started_at")
+
+    def __init__(self, tracer: StuartTracer, name: str) -> None:
+        """
+        Initialize the trace.
+
+        :param tracer: Tracer receiving the trace once it ends
+        :param name: Name of the traced cycle
+        """
+        super().__init__(self, name, 0)
+        self._tracer = tracer
+        self.started_at = dt_util.utcnow()
+        self.spans: list[dict[str, Any]] = []
+        self.dropped = 0
+        self.ended = False
+
+    def add_span(self, span: Span, end: float) -> None:
+        """
+        Record a finished span, or hand the trace to the tracer at its end.
+
+        Tasks started during the trace keep it in their context, spans they
+        finish after the trace ended are not recorded.
+        """
+        if self.ended:
+            return
+        if span is self:
+            self.ended = True
+            self._tracer.add_trace(self.as_dict(end))
+            return
+        if len(self.spans) >= TRACE_MAX_SPANS:
+            self.dropped += 1
+            return
+        self.spans.append(
+            {
+                "name": span.name,
+                "depth": span.depth,
+                "start_ms": round((span.start - self.start) * 1000, 3),
+                "duration_ms": round((end - span.start) * 1000, 3),
+                **span.attributes,
+            }
+        )
+
+    def as_dict(self, end: float) -> dict[str, Any]:
+        """Return the trace for the service response and diagnostics."""
+        return {
+            "name": self.name,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round((end - self.start) * 1000, 3),
+            **self.attributes,
+            "spans": list(self.spans),
+            "dropped_spans": self.dropped,
+        }
+
+
+_CURRENT_SPAN: ContextVar[Span | None] = ContextVar(
+    "stuartev_current_span", default=None
+)
+
+
+def span(name: str) -> Span | _NullSpan:
+    """
+    Return a span for a stage of the trace running in the current context.
+
+    :param name: Stage name
+    :return: Span to use as a context manager, a no-op outside of a trace
+    """
+    if (parent := _CURRENT_SPAN.get()) is None or parent.trace.ended:
+        return NULL_SPAN
+    return Span(parent.trace, name, parent.depth + 1)
+
+
+class StuartTracer:
+    """Ring buffer of the latest traces of a config entry."""
+
+    def __init__(self, *, enabled: bool, maxlen: int = TRACE_BUFFER_SIZE) -> None:
+        """
+        Initialize the tracer.
+
+        :param enabled: Whether traces are recorded
+        :param maxlen: Number of traces kept, older ones are discarded
+        """
+        self.enabled = enabled
+        self.traces: deque[dict[str, Any]] = deque(maxlen=maxlen)
+
+    def trace(self, name: str, **attributes: Any) -> Trace | _NullSpan:
+        """
+        Return a trace for a poll or history import.
+
+        :param name: Name of the traced cycle
+        :param attributes: Attributes stored with the trace, e.g. the site
+        :return: Trace to use as a context manager, a no-op if tracing is off
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        trace = Trace(self, name)
+        trace.attributes.update(attributes)
+        return trace
+
+    def add_trace(self, trace: dict[str, Any]) -> None:
+        """Store a finished trace, dropping the oldest one if the buffer is full."""
+        self.traces.append(trace)
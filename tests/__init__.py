@@ -0,0 +1 @@
+"""Tests for Stuart Energy integration."""
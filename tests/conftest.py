@@ -0,0 +1,6 @@
+"""Make the integration importable as ``stuartev``, like in the benchmarks."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "custom_components"))
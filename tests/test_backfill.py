@@ -0,0 +1,221 @@
+"""Tests of the windowed history backfill."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+from typing import TYPE_CHECKING
+from unittest.mock import AsyncMock, MagicMock, patch
+from zoneinfo import ZoneInfo
+
+import pytest
+from homeassistant.util import dt as dt_util
+from stuartev import cache as cache_module
+from stuartev.backfill import StuartEnergyBackfill
+from stuartev.cache import StuartEnergyHistoryCache
+from stuartev.exceptions import (
+    StuartEnergyApiClientCommunicationError,
+    StuartEnergyApiClientThrottledError,
+)
+from stuartev.importer import StuartEnergyImporter
+from stuartev.models import EnergySegments, SolarStats
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+TIME_ZONE = ZoneInfo("Europe/Vilnius")
+DATETIME_FORMAT_LOCAL = "%Y-%m-%dT%H:%M:%S"
+HOUR = timedelta(hours=1)
+# Reference time of the imports, the 14 days before it are closed.
+END = datetime(2025, 11, 1, 18, tzinfo=TIME_ZONE)
+
+
+def _day_segments(day: date) -> EnergySegments:
+    """Return one segment of 1 kWh per hour of a local day."""
+    segments = EnergySegments()
+    hour_start = dt_util.as_utc(datetime.combine(day, time.min, TIME_ZONE))
+    day_end = dt_util.as_utc(
+        datetime.combine(day + timedelta(days=1), time.min, TIME_ZONE)
+    )
+    while hour_start < day_end:
+        segments.append(int(hour_start.timestamp()), 1.0)
+        hour_start += HOUR
+    return segments
+
+
+class FakeApi:
+    """API answering solar-stats requests with 1 kWh per hour."""
+
+    def __init__(
+        self,
+        max_days: int = 31,
+        truncated_days: frozenset[date] = frozenset(),
+        error: Exception | None = None,
+    ) -> None:
+        """
+        Initialize the fake.
+
+        :param max_days: Longest window answered, longer ones fail
+        :param truncated_days: Days answered with less energy than announced
+        :param error: Error raised for every request
+        """
+        self.max_days = max_days
+        self.truncated_days = truncated_days
+        self.error = error
+        self.windows: list[tuple[date, date]] = []
+
+    async def async_get_energy_data(
+        self, date_from: str, date_to: str, aggregate_type: str = "Hour"
+    ) -> SolarStats:
+        """Return the segments of the requested days."""
+        assert aggregate_type == "Hour"
+        first_day = datetime.strptime(date_from, DATETIME_FORMAT_LOCAL).date()  # noqa: DTZ007
+        last_day = datetime.strptime(date_to, DATETIME_FORMAT_LOCAL).date()  # noqa: DTZ007
+        self.windows.append((first_day, last_day))
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        if (last_day - first_day).days + 1 > self.max_days:
+            msg = "Window too large"
+            raise StuartEnergyApiClientCommunicationError(msg)
+
+        segments = EnergySegments()
+        announced = 0.0
+        day = first_day
+        while day <= last_day:
+            day_segments = _day_segments(day)
+            announced += day_segments.total_kwh
+            if day in self.truncated_days:
+                day_segments.kwh[-1] = 0.5
+            segments.extend(day_segments)
+            day += timedelta(days=1)
+        return SolarStats(
+            total_kwh=announced, co2_kg=None, segments=segments, digests={}
+        )
+
+
+@pytest.fixture(autouse=True)
+def _time_zone() -> None:
+    """Use a time zone with DST transitions."""
+    dt_util.set_default_time_zone(TIME_ZONE)
+
+
+@pytest.fixture
+def importer() -> SimpleNamespace:
+    """Return an importer recording what it is asked to import."""
+    return SimpleNamespace(
+        aggregate_segments=StuartEnergyImporter.aggregate_segments,
+        import_hourly=AsyncMock(),
+    )
+
+
+@pytest.fixture
+def cache() -> Iterator[StuartEnergyHistoryCache]:
+    """Return a history cache whose store is not written."""
+    with patch.object(cache_module, "Store", MagicMock()):
+        yield StuartEnergyHistoryCache(SimpleNamespace(), "1")
+
+
+def _run(backfill: StuartEnergyBackfill, days: int) -> None:
+    """Import the given number of days before END."""
+    asyncio.run(backfill.async_run(END, days))
+
+
+def _imported_days(importer: SimpleNamespace) -> dict[date, int]:
+    """Return the hours imported per day, from a single import call."""
+    importer.import_hourly.assert_awaited_once()
+    (hourly_data,) = importer.import_hourly.await_args.args
+    days: dict[date, int] = {}
+    for hour_start in hourly_data:
+        days[hour_start.date()] = days.get(hour_start.date(), 0) + 1
+    return days
+
+
+def test_failed_window_is_split_in_half(importer: SimpleNamespace) -> None:
+    """A rejected window is fetched as halves and later windows use that size."""
+    api = FakeApi(max_days=2)
+    backfill = StuartEnergyBackfill(api, importer, concurrency=1, chunk_days=8)
+
+    _run(backfill, 16)
+
+    assert backfill.chunk_days == 2
+    assert api.windows[:4] == [
+        (date(2025, 10, 16), date(2025, 10, 23)),
+        (date(2025, 10, 16), date(2025, 10, 19)),
+        (date(2025, 10, 16), date(2025, 10, 17)),
+        (date(2025, 10, 18), date(2025, 10, 19)),
+    ]
+    # Later windows are requested in the reduced size right away.
+    assert all((last - first).days < 2 for first, last in api.windows[6:])
+    days = _imported_days(importer)
+    assert sorted(days) == [
+        date(2025, 10, 16) + timedelta(days=offset) for offset in range(16)
+    ]
+    # The repeated fall-back hour is bucketed into one, as in the gap scan.
+    assert days[date(2025, 10, 26)] == 24
+
+
+def test_concurrent_windows_import_every_day_once(importer: SimpleNamespace) -> None:
+    """Windows fetched concurrently are imported together in one pass."""
+    api = FakeApi()
+    backfill = StuartEnergyBackfill(api, importer, concurrency=3, chunk_days=3)
+
+    _run(backfill, 10)
+
+    assert sorted(api.windows) == [
+        (date(2025, 10, 22), date(2025, 10, 24)),
+        (date(2025, 10, 25), date(2025, 10, 27)),
+        (date(2025, 10, 28), date(2025, 10, 30)),
+        (date(2025, 10, 31), date(2025, 10, 31)),
+    ]
+    assert len(_imported_days(importer)) == 10
+    assert backfill.days_done == 10
+
+
+def test_throttling_does_not_shrink_windows(importer: SimpleNamespace) -> None:
+    """Throttling is propagated instead of splitting the window."""
+    api = FakeApi(error=StuartEnergyApiClientThrottledError("429"))
+    backfill = StuartEnergyBackfill(api, importer, concurrency=1, chunk_days=8)
+
+    with pytest.raises(StuartEnergyApiClientThrottledError):
+        _run(backfill, 8)
+
+    assert backfill.chunk_days == 8
+    assert len(api.windows) == 1
+
+
+def test_truncated_day_is_imported_but_not_cached(
+    importer: SimpleNamespace, cache: StuartEnergyHistoryCache
+) -> None:
+    """A day still incomplete as a single day is imported and fetched again."""
+    truncated = date(2025, 10, 29)
+    api = FakeApi(truncated_days=frozenset({truncated}))
+    backfill = StuartEnergyBackfill(
+        api, importer, concurrency=1, chunk_days=4, cache=cache
+    )
+
+    _run(backfill, 4)
+
+    assert truncated in _imported_days(importer)
+    assert truncated not in cache
+    assert all(
+        date(2025, 10, 28) + timedelta(days=offset) in cache for offset in (0, 2, 3)
+    )
+
+
+def test_cached_days_are_not_fetched(
+    importer: SimpleNamespace, cache: StuartEnergyHistoryCache
+) -> None:
+    """Complete closed days are read from the cache instead of the API."""
+    _run(StuartEnergyBackfill(FakeApi(), importer, 1, 4, cache=cache), 4)
+    api = FakeApi()
+    second_importer = SimpleNamespace(
+        aggregate_segments=StuartEnergyImporter.aggregate_segments,
+        import_hourly=AsyncMock(),
+    )
+
+    _run(StuartEnergyBackfill(api, second_importer, 1, 4, cache=cache), 4)
+
+    assert api.windows == []
+    assert len(_imported_days(second_importer)) == 4
@@ -0,0 +1,81 @@
+"""Tests of the history cache of closed days."""
+
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from zoneinfo import ZoneInfo
+
+import pytest
+from homeassistant.util import dt as dt_util
+from stuartev import cache as cache_module
+from stuartev.cache import StuartEnergyHistoryCache, history_store_key
+
+TIME_ZONE = ZoneInfo("Europe/Vilnius")
+FALL_BACK_DAY = date(2025, 10, 26)
+
+
+def _day_hourly(day: date, kwh: float = 1.0) -> dict[datetime, float]:
+    """Return the hourly energy of a complete day, stepped in UTC."""
+    start = dt_util.as_utc(datetime.combine(day, datetime.min.time(), TIME_ZONE))
+    end = dt_util.as_utc(
+        datetime.combine(day + timedelta(days=1), datetime.min.time(), TIME_ZONE)
+    )
+    hours = int((end - start).total_seconds() // 3600)
+    return {
+        dt_util.as_local(start + timedelta(hours=index)): kwh for index in range(hours)
+    }
+
+
+@pytest.fixture(autouse=True)
+def _time_zone() -> None:
+    """Use a time zone with DST transitions."""
+    dt_util.set_default_time_zone(TIME_ZONE)
+
+
+@pytest.fixture
+def cache() -> StuartEnergyHistoryCache:
+    """Return a cache whose store is not written."""
+    with patch.object(cache_module, "Store", MagicMock()):
+        return StuartEnergyHistoryCache(SimpleNamespace(), "1")
+
+
+@pytest.mark.parametrize("day", [FALL_BACK_DAY, date(2025, 1, 10)])
+def test_complete_day_is_read_back(cache: StuartEnergyHistoryCache, day: date) -> None:
+    """A day with all its hours is served from the cache."""
+    hourly = _day_hourly(day)
+    cache.put_day(day, hourly)
+
+    assert day in cache
+    assert cache.get_day(day) == hourly
+
+
+def test_incomplete_day_is_not_cached(cache: StuartEnergyHistoryCache) -> None:
+    """A day missing hours is fetched again instead of served from the cache."""
+    day = date(2025, 1, 10)
+    hourly = _day_hourly(day)
+    del hourly[min(hourly) + timedelta(hours=12)]
+    cache.put_day(day, hourly)
+
+    assert day not in cache
+    assert cache.get_day(day) is None
+
+
+def test_incomplete_stored_day_is_not_read_back(
+    cache: StuartEnergyHistoryCache,
+) -> None:
+    """A day stored with missing hours by an earlier version is ignored."""
+    day = date(2025, 1, 10)
+    cache.put_day(day, _day_hourly(day))
+    cache._days[day.isoformat()][1][12] = None  # noqa: SLF001
+
+    assert day not in cache
+    assert cache.get_day(day) is None
+
+
+def test_store_key_includes_endpoint_host() -> None:
+    """Sites behind an endpoint override do not share the real cache."""
+    assert history_store_key("1") == "stuartev.history.1"
+    assert (
+        history_store_key("1", "http://127.0.0.1:8099/")
+        == "stuartev.history.127_0_0_1_8099.1"
+    )
@@ -0,0 +1,103 @@
+"""Tests of the circuit breaker around the Stuart API."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from unittest.mock import patch
+
+import pytest
+from stuartev import circuit as circuit_module
+from stuartev.circuit import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    StuartCircuitBreaker,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+class FakeClock:
+    """Monotonic clock advanced by hand."""
+
+    def __init__(self) -> None:
+        """Start the clock at zero."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+@pytest.fixture
+def clock() -> Iterator[FakeClock]:
+    """Patch the clock of the circuit breaker."""
+    fake = FakeClock()
+    with patch.object(circuit_module.time, "monotonic", fake):
+        yield fake
+
+
+def _fail(breaker: StuartCircuitBreaker, times: int) -> None:
+    """Record failed requests."""
+    for _ in range(times):
+        assert breaker.allow_request()
+        breaker.record(success=False)
+
+
+def test_opens_after_consecutive_failures(clock: FakeClock) -> None:
+    """The circuit opens at the threshold and rejects requests until the timeout."""
+    breaker = StuartCircuitBreaker(failure_threshold=3, reset_timeout=60)
+
+    _fail(breaker, 2)
+    assert breaker.state == STATE_CLOSED
+    _fail(breaker, 1)
+
+    assert breaker.state == STATE_OPEN
+    clock.now = 59
+    assert not breaker.allow_request()
+
+
+@pytest.mark.usefixtures("clock")
+def test_success_resets_failures() -> None:
+    """Failures only count while they are consecutive."""
+    breaker = StuartCircuitBreaker(failure_threshold=3, reset_timeout=60)
+
+    _fail(breaker, 2)
+    assert breaker.allow_request()
+    breaker.record(success=True)
+    _fail(breaker, 2)
+
+    assert breaker.state == STATE_CLOSED
+
+
+def test_single_probe_after_timeout(clock: FakeClock) -> None:
+    """One probe is allowed after the timeout, its outcome decides the state."""
+    breaker = StuartCircuitBreaker(failure_threshold=1, reset_timeout=60)
+    _fail(breaker, 1)
+    clock.now = 60
+
+    assert breaker.allow_request()
+    assert breaker.state == STATE_HALF_OPEN
+    assert not breaker.allow_request()
+    breaker.record(success=False)
+    assert breaker.state == STATE_OPEN
+
+    clock.now = 120
+    assert breaker.allow_request()
+    breaker.record(success=True)
+    assert breaker.state == STATE_CLOSED
+    assert breaker.allow_request()
+
+
+def test_abandoned_probe_allows_another(clock: FakeClock) -> None:
+    """A probe without an outcome leaves the circuit half open for the next."""
+    breaker = StuartCircuitBreaker(failure_threshold=1, reset_timeout=60)
+    _fail(breaker, 1)
+    clock.now = 60
+
+    assert breaker.allow_request()
+    breaker.record(success=None)
+
+    assert breaker.state == STATE_HALF_OPEN
+    assert breaker.allow_request()
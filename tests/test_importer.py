@@ -0,0 +1,267 @@
+"""Tests of the sum chain and the recorder gap scan of the importer."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+import pytest
+from homeassistant.util import dt as dt_util
+from stuartev import importer as importer_module
+from stuartev.importer import StuartEnergyImporter
+from stuartev.models import local_hour_epoch
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+TIME_ZONE = ZoneInfo("Europe/Vilnius")
+STATISTIC_ID = "stuartev:test_energy"
+FALL_BACK_DAY = date(2025, 10, 26)
+SPRING_FORWARD_DAY = date(2025, 3, 30)
+HOUR = timedelta(hours=1)
+START = datetime(2025, 6, 1, 10, tzinfo=TIME_ZONE)
+
+
+class FakeRecorder:
+    """Recorder holding the hourly rows of one statistic in memory."""
+
+    def __init__(self) -> None:
+        """Initialize an empty recorder."""
+        self.rows: dict[float, dict[str, Any]] = {}
+        self.reads = 0
+
+    def add(self, _hass: Any, _metadata: Any, rows: list[dict[str, Any]]) -> None:
+        """Insert or replace rows, as async_add_external_statistics does."""
+        for row in rows:
+            start = row["start"].timestamp()
+            self.rows[start] = {**row, "start": start}
+
+    def during_period(
+        self,
+        _hass: Any,
+        start_time: datetime,
+        end_time: datetime | None,
+        _statistic_ids: set[str],
+        _period: str,
+        _units: Any,
+        _types: set[str],
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Return the rows starting in a period."""
+        self.reads += 1
+        rows = [
+            row
+            for start, row in sorted(self.rows.items())
+            if start >= start_time.timestamp()
+            and (end_time is None or start < end_time.timestamp())
+        ]
+        return {STATISTIC_ID: rows} if rows else {}
+
+    def last(self, *_args: Any, **_kwargs: Any) -> dict[str, list[dict[str, Any]]]:
+        """Return the last row."""
+        self.reads += 1
+        if not self.rows:
+            return {}
+        return {STATISTIC_ID: [self.rows[max(self.rows)]]}
+
+    def sums(self) -> list[float]:
+        """Return the sums in hour order."""
+        return [round(row["sum"], 5) for _, row in sorted(self.rows.items())]
+
+    async def async_add_executor_job(self, func: Any, *args: Any) -> Any:
+        """Run a recorder job inline, yielding to other tasks first."""
+        await asyncio.sleep(0)
+        return func(*args)
+
+    async def async_block_till_done(self) -> None:
+        """Return at once, rows are written when they are added."""
+
+
+@pytest.fixture
+def recorder() -> Iterator[FakeRecorder]:
+    """Patch the recorder used by the importer."""
+    fake = FakeRecorder()
+    with (
+        patch.object(importer_module, "get_instance", return_value=fake),
+        patch.object(importer_module, "async_add_external_statistics", fake.add),
+        patch.object(importer_module, "statistics_during_period", fake.during_period),
+        patch.object(importer_module, "get_last_statistics", fake.last),
+    ):
+        yield fake
+
+
+def _hourly(*kwh: float, start: datetime = START) -> dict[datetime, float]:
+    """Return consecutive hours with the given energy."""
+    return {start + index * HOUR: value for index, value in enumerate(kwh)}
+
+
+def _importer() -> StuartEnergyImporter:
+    """Return an importer for the test statistic."""
+    return StuartEnergyImporter(SimpleNamespace(), {}, STATISTIC_ID)
+
+
+def _day_rows(day: date, kwh: float) -> list[dict[str, Any]]:
+    """Return the hourly rows a complete import of a day writes."""
+    hours = {
+        local_hour_epoch(f"{day.isoformat()}T{hour:02}:{minute:02}:00", TIME_ZONE)
+        for hour in range(24)
+        for minute in (0, 15, 30, 45)
+    }
+    return [{"start": hour, "state": kwh} for hour in sorted(hours)]
+
+
+def _find_gap_days(
+    rows: list[dict[str, Any]],
+    first_day: date,
+    last_day: date,
+    fetched_days: set[date] | None = None,
+) -> list[date]:
+    """Run the gap scan over ``rows`` as the recorded statistics."""
+
+    async def _async_add_executor_job(*_args: Any) -> dict[str, Any]:
+        return {STATISTIC_ID: rows}
+
+    recorder = SimpleNamespace(async_add_executor_job=_async_add_executor_job)
+    with patch.object(importer_module, "get_instance", return_value=recorder):
+        return asyncio.run(
+            _importer().async_find_gap_days(first_day, last_day, fetched_days or set())
+        )
+
+
+@pytest.fixture(autouse=True)
+def _time_zone() -> None:
+    """Use a time zone with DST transitions."""
+    dt_util.set_default_time_zone(TIME_ZONE)
+
+
+@pytest.mark.parametrize("day", [FALL_BACK_DAY, SPRING_FORWARD_DAY])
+def test_complete_dst_day_is_not_a_gap(day: date) -> None:
+    """A fully imported DST day has as many rows as hours it is bucketed in."""
+    first_day = day - timedelta(days=3)
+    last_day = day + timedelta(days=3)
+    rows = [
+        row
+        for offset in range((last_day - first_day).days + 1)
+        for row in _day_rows(first_day + timedelta(days=offset), 1.0)
+    ]
+
+    assert _find_gap_days(rows, first_day, last_day) == []
+
+
+def test_missing_hour_is_a_gap() -> None:
+    """A day missing one hourly row is reported."""
+    rows = _day_rows(FALL_BACK_DAY, 1.0)
+    del rows[12]
+
+    assert _find_gap_days(rows, FALL_BACK_DAY, FALL_BACK_DAY) == [FALL_BACK_DAY]
+
+
+def test_zero_day_is_a_gap_until_fetched() -> None:
+    """A day without energy is fetched once, then trusted."""
+    day = date(2025, 1, 10)
+    rows = _day_rows(day, 0.0)
+
+    assert _find_gap_days(rows, day, day) == [day]
+    assert _find_gap_days(rows, day, day, {day}) == []
+
+
+def test_daily_total_is_not_a_gap() -> None:
+    """A single row at midnight is a stored daily total."""
+    day = date(2025, 1, 10)
+    rows = _day_rows(day, 0.5)[:1]
+
+    assert _find_gap_days(rows, day, day) == []
+
+
+def test_sums_continue_the_recorded_chain(recorder: FakeRecorder) -> None:
+    """Sums of an import continue from the last recorded sum."""
+    importer = _importer()
+    asyncio.run(importer.import_hourly(_hourly(1.0, 2.0)))
+    asyncio.run(_importer().import_hourly(_hourly(3.0, start=START + 2 * HOUR)))
+
+    assert recorder.sums() == [1.0, 3.0, 6.0]
+
+
+def test_revision_shifts_later_hours(recorder: FakeRecorder) -> None:
+    """A revised hour rewrites the window and shifts the recorded hours after it."""
+    importer = _importer()
+    asyncio.run(importer.import_hourly(_hourly(1.0, 1.0, 1.0, 1.0, 1.0)))
+
+    asyncio.run(importer.import_hourly(_hourly(1.0, 2.0)))
+
+    assert recorder.sums() == [1.0, 3.0, 4.0, 5.0, 6.0]
+
+
+def test_backfill_before_recorded_hours_keeps_chain(recorder: FakeRecorder) -> None:
+    """Importing hours before recorded ones moves the later sums onto them."""
+    asyncio.run(_importer().import_hourly(_hourly(1.0, 1.0, start=START + 2 * HOUR)))
+
+    asyncio.run(_importer().import_hourly(_hourly(2.0, 3.0)))
+
+    assert recorder.sums() == [2.0, 5.0, 6.0, 7.0]
+
+
+def test_unchanged_hours_are_not_written(recorder: FakeRecorder) -> None:
+    """Hours imported with the same energy again are skipped."""
+    importer = _importer()
+    asyncio.run(importer.import_hourly(_hourly(1.0, 2.0)))
+    recorder.rows.clear()
+
+    asyncio.run(importer.import_hourly(_hourly(1.0, 2.0)))
+
+    assert recorder.rows == {}
+
+
+def test_next_hour_uses_remembered_sum(recorder: FakeRecorder) -> None:
+    """A poll continuing the last written hour only reads that hour back."""
+    importer = _importer()
+    asyncio.run(importer.import_hourly(_hourly(1.0, 2.0)))
+    reads = recorder.reads
+
+    asyncio.run(importer.import_hourly(_hourly(1.0, 2.0, 3.0)))
+
+    assert recorder.reads == reads + 1
+    assert importer.sum_cache_hits == 1
+    assert recorder.sums() == [1.0, 3.0, 6.0]
+
+
+def test_adjusted_sum_is_continued(recorder: FakeRecorder) -> None:
+    """A sum adjusted outside of the importer replaces the remembered ones."""
+    importer = _importer()
+    asyncio.run(importer.import_hourly(_hourly(1.0, 2.0)))
+    for row in recorder.rows.values():
+        row["sum"] += 10.0
+
+    asyncio.run(importer.import_hourly(_hourly(1.0, 2.0, 3.0)))
+
+    assert recorder.sums() == [11.0, 13.0, 16.0]
+
+
+def test_cleared_statistic_is_written_again(recorder: FakeRecorder) -> None:
+    """Hours removed from the recorder are written again by the next polls."""
+    importer = _importer()
+    asyncio.run(importer.import_hourly(_hourly(1.0, 2.0)))
+    recorder.rows.clear()
+
+    asyncio.run(importer.import_hourly(_hourly(1.0, 2.0, 3.0)))
+    asyncio.run(importer.import_hourly(_hourly(1.0, 2.0, 3.0)))
+
+    assert recorder.sums() == [1.0, 3.0, 6.0]
+
+
+def test_concurrent_imports_keep_chain(recorder: FakeRecorder) -> None:
+    """A poll running during a history import continues its sums."""
+    importer = _importer()
+
+    async def _run() -> None:
+        await asyncio.gather(
+            importer.import_hourly(_hourly(1.0, 1.0)),
+            importer.import_hourly(_hourly(2.0, start=START + 2 * HOUR)),
+        )
+
+    asyncio.run(_run())
+
+    assert recorder.sums() == [1.0, 2.0, 4.0]
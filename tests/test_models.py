@@ -0,0 +1,67 @@
+"""Tests of the sensor values derived from the hourly data."""
+
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+from homeassistant.util import dt as dt_util
+from stuartev.models import DerivedEnergy
+
+TIME_ZONE = ZoneInfo("Europe/Vilnius")
+HOUR = timedelta(hours=1)
+TODAY = date(2025, 6, 10)
+YESTERDAY = TODAY - timedelta(days=1)
+
+
+def _hours(day: date, count: int, kwh: float = 1.0) -> dict[datetime, float]:
+    """Return the first hours of a day with the same energy."""
+    midnight = datetime(day.year, day.month, day.day, tzinfo=TIME_ZONE)
+    return {midnight + index * HOUR: kwh for index in range(count)}
+
+
+@pytest.fixture(autouse=True)
+def _time_zone() -> None:
+    """Use a time zone with DST transitions."""
+    dt_util.set_default_time_zone(TIME_ZONE)
+
+
+def test_values_of_the_day() -> None:
+    """Today, yesterday, the last complete hour and the peak hour are derived."""
+    hourly = {**_hours(YESTERDAY, 24), **_hours(TODAY, 14)}
+    peak = datetime(2025, 6, 10, 12, tzinfo=TIME_ZONE)
+    hourly[peak] = 3.0
+    now = datetime(2025, 6, 10, 14, 20, tzinfo=TIME_ZONE)
+
+    derived = DerivedEnergy.from_hourly(hourly, now, {})
+
+    assert derived.today_kwh == 16.0
+    assert derived.yesterday_kwh == 24.0
+    assert derived.last_hour_start == datetime(2025, 6, 10, 13, tzinfo=TIME_ZONE)
+    assert derived.last_hour_power_w == 1000.0
+    assert derived.peak_hour_start == peak
+    assert derived.peak_hour_kwh == 3.0
+
+
+def test_rolling_total_needs_every_earlier_day() -> None:
+    """The rolling total is unknown until all earlier days are known."""
+    hourly = {**_hours(YESTERDAY, 24), **_hours(TODAY, 10)}
+    now = datetime(2025, 6, 10, 10, 30, tzinfo=TIME_ZONE)
+    day_totals = {TODAY - timedelta(days=days_ago): 10.0 for days_ago in range(2, 7)}
+
+    assert DerivedEnergy.from_hourly(hourly, now, day_totals).rolling_kwh == 84.0
+    del day_totals[TODAY - timedelta(days=4)]
+    assert DerivedEnergy.from_hourly(hourly, now, day_totals).rolling_kwh is None
+
+
+def test_night_without_poll_moves_on() -> None:
+    """After midnight the day rolls over and the ended night hour is zero."""
+    hourly = {**_hours(YESTERDAY, 24), **_hours(TODAY, 19)}
+    now = datetime(2025, 6, 11, 2, 0, tzinfo=TIME_ZONE)
+
+    derived = DerivedEnergy.from_hourly(hourly, now, {}, sun_down=True)
+
+    assert derived.today_kwh == 0.0
+    assert derived.yesterday_kwh == 19.0
+    assert derived.last_hour_start == datetime(2025, 6, 11, 1, tzinfo=TIME_ZONE)
+    assert derived.last_hour_kwh == 0.0
+    assert derived.peak_hour_start is None
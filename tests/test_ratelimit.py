@@ -0,0 +1,40 @@
+"""Tests of the token bucket limiting requests to the Stuart API."""
+
+import asyncio
+import time
+
+from stuartev.ratelimit import StuartRateLimiter
+
+
+def _acquire_seconds(limiter: StuartRateLimiter, requests: int) -> float:
+    """Return how long acquiring the given number of requests takes."""
+
+    async def _run() -> float:
+        started = time.monotonic()
+        for _ in range(requests):
+            await limiter.async_acquire()
+        return time.monotonic() - started
+
+    return asyncio.run(_run())
+
+
+def test_burst_is_not_delayed() -> None:
+    """Requests up to the burst are released at once."""
+    limiter = StuartRateLimiter(rate=1.0, burst=3)
+
+    assert _acquire_seconds(limiter, 3) < 0.1
+
+
+def test_requests_after_burst_wait_for_rate() -> None:
+    """Requests beyond the burst are spaced by the rate."""
+    limiter = StuartRateLimiter(rate=20.0, burst=1)
+
+    assert _acquire_seconds(limiter, 3) >= 0.09
+
+
+def test_pause_holds_back_requests() -> None:
+    """A Retry-After pause delays the next request even with tokens left."""
+    limiter = StuartRateLimiter(rate=1.0, burst=5)
+    limiter.pause(0.2)
+
+    assert _acquire_seconds(limiter, 1) >= 0.19
@@ -0,0 +1,76 @@
+"""Tests of the adaptive poll scheduler."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+from homeassistant.const import SUN_EVENT_SUNRISE
+from homeassistant.util import dt as dt_util
+from stuartev import scheduler as scheduler_module
+from stuartev.const import PUBLICATION_LAG_DEFAULT
+from stuartev.scheduler import StuartPollScheduler
+
+TIME_ZONE = ZoneInfo("Europe/Vilnius")
+HOUR = timedelta(hours=1)
+SCAN_INTERVAL = timedelta(hours=3)
+NOON = datetime(2025, 6, 10, 12, tzinfo=TIME_ZONE)
+
+
+def _next_sun_event(_hass: object, event: str, utc_point_in_time: datetime) -> datetime:
+    """Return the next sunrise at 05:00 or sunset at 22:00 local time."""
+    moment = dt_util.as_local(utc_point_in_time)
+    event_time = moment.replace(
+        hour=5 if event == SUN_EVENT_SUNRISE else 22,
+        minute=0,
+        second=0,
+        microsecond=0,
+    )
+    if event_time <= moment:
+        event_time += timedelta(days=1)
+    return event_time
+
+
+@pytest.fixture(autouse=True)
+def _sun(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Use fixed sun events in a time zone with DST transitions."""
+    dt_util.set_default_time_zone(TIME_ZONE)
+    monkeypatch.setattr(scheduler_module, "get_astral_event_next", _next_sun_event)
+
+
+def _polls(scheduler: StuartPollScheduler, now: datetime, count: int) -> list:
+    """Return the times of the next polls, each run when it is due."""
+    polls = []
+    for _ in range(count):
+        now += scheduler.next_poll_delay(now)
+        polls.append(now)
+    return polls
+
+
+def test_staggered_sites_poll_at_different_times() -> None:
+    """Sites keep their stagger offset on every adaptively scheduled poll."""
+    stagger = timedelta(minutes=10)
+    first = StuartPollScheduler(SimpleNamespace(), SCAN_INTERVAL)
+    second = StuartPollScheduler(SimpleNamespace(), SCAN_INTERVAL, stagger=stagger)
+
+    first_polls = _polls(first, NOON, 3)
+    second_polls = _polls(second, NOON, 3)
+
+    assert first_polls[0] == NOON + SCAN_INTERVAL + PUBLICATION_LAG_DEFAULT
+    for first_poll, second_poll in zip(first_polls, second_polls, strict=True):
+        assert second_poll - first_poll == stagger
+
+
+@pytest.mark.parametrize("minute", [0, 19, 21, 50])
+def test_polls_are_at_least_scan_interval_apart(minute: int) -> None:
+    """The next poll is the first publication time after the scan interval."""
+    scheduler = StuartPollScheduler(SimpleNamespace(), SCAN_INTERVAL)
+    now = NOON.replace(minute=minute)
+
+    next_poll = now + scheduler.next_poll_delay(now)
+
+    assert next_poll >= now + SCAN_INTERVAL
+    assert next_poll - (now + SCAN_INTERVAL) < HOUR
+    assert next_poll.minute == PUBLICATION_LAG_DEFAULT.seconds // 60
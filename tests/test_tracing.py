@@ -0,0 +1,39 @@
+"""Tests of the poll and history import traces."""
+
+import asyncio
+
+from stuartev.tracing import StuartTracer, span
+
+
+def test_spans_after_the_trace_ended_are_dropped() -> None:
+    """A task outliving its trace does not change the stored trace."""
+    tracer = StuartTracer(enabled=True)
+    release = asyncio.Event()
+
+    async def _outliving_task() -> None:
+        await release.wait()
+        with span("late"):
+            pass
+
+    async def _run() -> None:
+        with tracer.trace("poll"):
+            with span("early"):
+                pass
+            task = asyncio.create_task(_outliving_task())
+        release.set()
+        await task
+
+    asyncio.run(_run())
+
+    assert [stored["name"] for stored in tracer.traces[0]["spans"]] == ["early"]
+
+
+def test_stored_trace_is_a_snapshot() -> None:
+    """The spans of a stored trace are a copy of the recorded list."""
+    tracer = StuartTracer(enabled=True)
+    with tracer.trace("poll") as trace, span("early"):
+        pass
+
+    trace.spans.append({"name": "late"})
+
+    assert len(tracer.traces[0]["spans"]) == 1